@@ -2,6 +2,11 @@
 set -o errexit
 
 pip install -r requirements.txt
+
+# LINE Pay 簽章使用 hashlib.sha256 (HMAC)，需 OpenSSL >= 1.1.1 才會走 SHA-NI 硬體加速
+python -c "import ssl; print('OpenSSL:', ssl.OPENSSL_VERSION); assert ssl.OPENSSL_VERSION_INFO >= (1, 1, 1), 'OpenSSL >= 1.1.1 required'"
+grep -q -m1 sha_ni /proc/cpuinfo 2>/dev/null || echo "notice: CPU 未提供 sha_ni，SHA-256 將使用軟體實作"
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
 python manage.py createsuperuser --noinput || true
@@ -1,5 +1,45 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
 from django.apps import AppConfig
 
+# settings.LOGGING 中掛有輸出 handler 的 logger
+QUEUED_LOGGERS = ("", "django", "ordering")
+
+
+def start_log_queue():
+    """
+    把 console handler 移到背景執行緒 (QueueListener)，
+    請求執行緒寫 log 時只需放進佇列，不會卡在 stdout 的寫入上。
+    """
+    loggers = [logging.getLogger(name) for name in QUEUED_LOGGERS]
+    handlers = []
+    for lg in loggers:
+        for handler in lg.handlers:
+            if handler not in handlers and not isinstance(handler, QueueHandler):
+                handlers.append(handler)
+    if not handlers:
+        return
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    for lg in loggers:
+        if lg.handlers:
+            lg.handlers = [queue_handler]
+
+    listener.start()
+    # 程序結束前把佇列中剩下的 log 寫完
+    atexit.register(listener.stop)
+
 
 class OrderingConfig(AppConfig):
     name = "ordering"
+
+    def ready(self):
+        # 註冊快取失效用的 signals
+        from . import signals  # noqa: F401
+
+        start_log_queue()
@@ -0,0 +1,116 @@
+# ordering/cache.py
+import time
+
+import orjson
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+
+from .models import Store
+
+# 分店資料幾乎不會變動，快取 30 分鐘；後台修改時由 signals 主動清除
+STORE_CACHE_TIMEOUT = 1800
+STORE_LIST_CACHE_KEY = "store:list:active"
+STORE_OBJECTS_CACHE_KEY = "store:objects:active"
+
+# 訂單相關的讀取端點：報表以分鐘為單位快取，叫號看板只快取幾秒
+DASHBOARD_CACHE_TIMEOUT = 60
+LATEST_CACHE_TIMEOUT = 5
+# 後台訂單列表只合併同一瞬間的重複輪詢，避免老闆操作後看到舊狀態
+ORDER_LIST_CACHE_TIMEOUT = 1
+
+
+def store_cache_key(slug):
+    return f"store:slug:{slug}"
+
+
+def store_id_cache_key(store_id):
+    return f"store:id:{store_id}"
+
+
+def get_store_or_404(slug):
+    """以 slug 取得分店 (優先讀快取)，找不到時拋出 404"""
+    key = store_cache_key(slug)
+    store = cache.get(key)
+    if store is None:
+        store = get_object_or_404(Store, slug=slug)
+        cache.set(key, store, STORE_CACHE_TIMEOUT)
+    return store
+
+
+def get_store_by_id_or_404(store_id):
+    """以 id 取得分店 (優先讀快取)，供後台 ?store=ID 切換分店與付款回調使用"""
+    key = store_id_cache_key(store_id)
+    store = cache.get(key)
+    if store is None:
+        store = get_object_or_404(Store, id=store_id)
+        cache.set(key, store, STORE_CACHE_TIMEOUT)
+    return store
+
+
+def get_store_list_json():
+    """營業中分店清單 (已編碼的 JSON bytes)，供 /api/stores/ 直接回傳"""
+    body = cache.get(STORE_LIST_CACHE_KEY)
+    if body is None:
+        stores = Store.objects.filter(is_active=True).values("name", "slug")
+        body = orjson.dumps(list(stores))
+        cache.set(STORE_LIST_CACHE_KEY, body, STORE_CACHE_TIMEOUT)
+    return body
+
+
+def get_active_stores():
+    """營業中分店 (Store 物件 list，依 id 排序)，供各頁面的分店選單使用"""
+    stores = cache.get(STORE_OBJECTS_CACHE_KEY)
+    if stores is None:
+        stores = list(Store.objects.filter(is_active=True).order_by("id"))
+        cache.set(STORE_OBJECTS_CACHE_KEY, stores, STORE_CACHE_TIMEOUT)
+    return stores
+
+
+def invalidate_store(slug, store_id=None):
+    keys = [store_cache_key(slug), STORE_LIST_CACHE_KEY, STORE_OBJECTS_CACHE_KEY]
+    if store_id is not None:
+        keys.append(store_id_cache_key(store_id))
+    cache.delete_many(keys)
+
+
+# ------------------------------------------
+# 訂單快取版本號
+# 各分店一個版本號，訂單有異動就換新值；報表與看板的快取 key 都帶上版本號，
+# 版本一變舊 key 自然失效，不需要 delete_pattern 這類後端專屬功能。
+# ------------------------------------------
+def orders_version_key(store_id):
+    return f"orders:ver:{store_id}"
+
+
+def get_orders_version(store_id):
+    key = orders_version_key(store_id)
+    version = cache.get(key)
+    if version is None:
+        # 以時間戳當初始值，避免版本號被清掉後又從舊數字開始撞到舊快取
+        # 用 add()：多個 worker 同時初始化時只有第一個寫入，其餘讀回同一個值
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_orders_version(store_id):
+    """
+    訂單異動後換上新的版本號，讓該分店的報表 / 看板快取全部失效。
+    - 直接寫入新的時間戳而不是 incr()：資料庫快取的 incr 是讀後寫，併發時會少加一次
+    - 等交易提交後才換：否則其他 worker 可能在提交前以舊資料填入新版本的快取
+    """
+    key = orders_version_key(store_id)
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def dashboard_cache_key(store_id, minute_bucket):
+    return f"dash:{store_id}:{get_orders_version(store_id)}:{minute_bucket}"
+
+
+def latest_cache_key(store_id):
+    return f"latest:{store_id}:{get_orders_version(store_id)}"
+
+
+def order_list_cache_key(store_id):
+    return f"orders:list:{store_id}:{get_orders_version(store_id)}"
@@ -50,9 +50,15 @@ class ProductForm(forms.ModelForm):
         self.fields["category"].label_from_instance = (
             lambda obj: f"{obj.name} ({obj.store.name})"
         )
+        # 顯示名稱會讀取 store，先 JOIN 避免每個選項各查一次
+        self.fields["category"].queryset = self.fields[
+            "category"
+        ].queryset.select_related("store")
 
         # 3. (選用) 如果有傳入分店，就只顯示該分店的分類，避免選錯
         if store:
-            self.fields["category"].queryset = Category.objects.filter(
-                store=store
-            ).order_by("sort_order")
+            self.fields["category"].queryset = (
+                Category.objects.filter(store=store)
+                .select_related("store")
+                .order_by("sort_order")
+            )
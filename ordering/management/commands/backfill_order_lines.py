@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ordering.models import Order
+
+
+class Command(BaseCommand):
+    # 部署時由 migration 0004 一次補建；此指令留給需要手動重跑時使用，不必每次部署執行
+    help = "為尚未建立明細 (OrderItem) 的舊訂單，依 items 快照補建明細"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="每批處理的訂單數"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        orders = Order.objects.filter(lines__isnull=True).only("id", "items")
+
+        count = 0
+        while True:
+            batch = list(orders.order_by("id")[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                for order in batch:
+                    order.sync_lines()
+            count += len(batch)
+            # 沒有任何有效品項的訂單補完後仍沒有明細，下一輪從這批之後繼續
+            orders = orders.filter(id__gt=batch[-1].id)
+
+        self.stdout.write(self.style.SUCCESS(f"已補建 {count} 筆訂單的明細"))
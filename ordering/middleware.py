@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+
+SESSION_REFRESHED_AT_KEY = "_refreshed_at"
+
+
+class SessionRefreshMiddleware:
+    """
+    取代 SESSION_SAVE_EVERY_REQUEST：已登入的 session 每隔 SESSION_REFRESH_INTERVAL 秒
+    才寫回一次並延長期限，仍維持滑動過期，但後台輪詢不必每次請求都寫 session 表。
+    須放在 SessionMiddleware 之後 (回應階段會先於 SessionMiddleware 執行)。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, "session", None)
+        # 未登入的顧客 session 是空的，本來就不會寫入
+        if session is None or session.is_empty():
+            return response
+
+        now = int(time.time())
+        last = session.get(SESSION_REFRESHED_AT_KEY, 0)
+        if now - last >= settings.SESSION_REFRESH_INTERVAL:
+            # 標記為已修改，SessionMiddleware 會寫回並重新計算 cookie 到期時間
+            session[SESSION_REFRESHED_AT_KEY] = now
+        return response
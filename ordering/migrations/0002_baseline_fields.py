@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 01:30
+#
+# 補上 0001 之後直接加進 models、卻從未產生 migration 的欄位與索引。
+# 已手動 (或以未提交的 migration) 建好這些欄位的既有資料庫，
+# 請先執行一次 `python manage.py migrate ordering 0002 --fake` 標記為已套用，再正常 migrate。
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ordering", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="daily_serial",
+            field=models.PositiveIntegerField(default=0, verbose_name="當日流水號"),
+        ),
+        migrations.AddField(
+            model_name="store",
+            name="enable_linepay",
+            field=models.BooleanField(default=True, verbose_name="啟用 LINE Pay"),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "訂單確認中"),
+                    ("confirmed", "訂單已成立"),
+                    ("preparing", "訂單製作中"),
+                    ("completed", "訂單完成"),
+                    ("arrived", "客人已到櫃檯"),
+                    ("final", "交易結案"),
+                    ("cancelled", "已取消"),
+                    ("archived", "已歸檔"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="訂單狀態",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["store", "created_at"], name="ordering_or_store_i_18365a_idx"
+            ),
+        ),
+    ]
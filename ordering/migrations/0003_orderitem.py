@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-16 01:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ordering", "0002_baseline_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="品名")),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="分類代碼"
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField(verbose_name="數量")),
+                ("price", models.PositiveIntegerField(verbose_name="單價")),
+            ],
+            options={
+                "verbose_name": "訂單明細",
+                "verbose_name_plural": "訂單明細",
+            },
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "訂單確認中"),
+                    ("paying", "付款確認中"),
+                    ("confirmed", "訂單已成立"),
+                    ("refunding", "退款處理中"),
+                    ("preparing", "訂單製作中"),
+                    ("completed", "訂單完成"),
+                    ("arrived", "客人已到櫃檯"),
+                    ("final", "交易結案"),
+                    ("cancelled", "已取消"),
+                    ("archived", "已歸檔"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="訂單狀態",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["store", "status", "created_at"],
+                name="ordering_or_store_i_a164a2_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(
+                    (
+                        "status__in",
+                        (
+                            "pending",
+                            "paying",
+                            "confirmed",
+                            "refunding",
+                            "preparing",
+                            "completed",
+                            "arrived",
+                        ),
+                    )
+                ),
+                fields=["store", "-id"],
+                name="ord_active_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="order",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lines",
+                to="ordering.order",
+                verbose_name="所屬訂單",
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="product",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="ordering.product",
+                verbose_name="商品",
+            ),
+        ),
+    ]
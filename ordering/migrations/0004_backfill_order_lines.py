@@ -0,0 +1,52 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_order_lines(apps, schema_editor):
+    """
+    依 items 快照為既有訂單建立明細，規則同 OrderItem.from_snapshot
+    (migration 中只能使用歷史 model，不能呼叫 model 上的方法)。
+    """
+    Order = apps.get_model("ordering", "Order")
+    OrderItem = apps.get_model("ordering", "OrderItem")
+
+    lines = []
+    orders = Order.objects.filter(lines__isnull=True).only("id", "items")
+    for order in orders.order_by("id").iterator(chunk_size=BATCH_SIZE):
+        if not isinstance(order.items, list):
+            continue
+        for item in order.items:
+            try:
+                qty = int(item.get("quantity") or item.get("qty") or 0)
+                price = int(item.get("price") or 0)
+                product_id = int(item["id"]) if item.get("id") else None
+            except (AttributeError, ValueError, TypeError):
+                continue
+            if qty <= 0:
+                continue
+            lines.append(
+                OrderItem(
+                    order_id=order.id,
+                    product_id=product_id,
+                    name=item.get("name") or "未知商品",
+                    category=item.get("category") or "",
+                    quantity=qty,
+                    price=price,
+                )
+            )
+        if len(lines) >= BATCH_SIZE:
+            OrderItem.objects.bulk_create(lines)
+            lines = []
+    OrderItem.objects.bulk_create(lines)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ordering", "0003_orderitem"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_lines, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 import datetime
 from django.utils import timezone
-from django.db.models import Max
+from django.db.models import Max, Q
 
 
 # ==========================================
@@ -111,10 +111,24 @@ class Product(models.Model):
 # ==========================================
 # 4. 訂單 (Order)
 # ==========================================
+# 尚未結案的訂單狀態 (店家看板、每日結算都以此判斷)
+ACTIVE_ORDER_STATUSES = (
+    "pending",
+    "paying",
+    "confirmed",
+    "refunding",
+    "preparing",
+    "completed",
+    "arrived",
+)
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ("pending", "訂單確認中"),  # 剛建立 / 待付款
+        ("paying", "付款確認中"),  # LINE Pay Confirm 進行中 (防止重複確認)
         ("confirmed", "訂單已成立"),  # 已付款 / 店家已接單
+        ("refunding", "退款處理中"),  # LINE Pay 退款中 (防止重複退款)
         ("preparing", "訂單製作中"),
         ("completed", "訂單完成"),  # 製作完成
         ("arrived", "客人已到櫃檯"),  # 用於叫號通知
@@ -171,6 +185,14 @@ class Order(models.Model):
         # ✨ 新增索引：加快查詢「某分店+某天」的訂單速度
         indexes = [
             models.Index(fields=["store", "created_at"]),
+            # 報表：某分店某期間內「已成交」訂單的範圍掃描
+            models.Index(fields=["store", "status", "created_at"]),
+            # 部分索引：只收錄未結案訂單，看板輪詢「進行中訂單」時不必掃整張表
+            models.Index(
+                fields=["store", "-id"],
+                name="ord_active_idx",
+                condition=Q(status__in=ACTIVE_ORDER_STATUSES),
+            ),
         ]
 
     def __str__(self):
@@ -202,9 +224,18 @@ class Order(models.Model):
         1. 自動計算總金額。
         2. 若是新訂單，自動產生當日流水號。
         3. 自動填寫完成時間。
+        4. 寫入 items 時同步重建訂單明細 (OrderItem)。
         """
-        # 1. 計算金額
-        self.update_total_from_json()
+        # 1. 計算金額 (只更新狀態等欄位時不需重算，也不必讀取 items)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"items", "subtotal", "total"} & set(update_fields):
+            self.update_total_from_json()
+            if update_fields is not None:
+                update_fields = kwargs["update_fields"] = {
+                    *update_fields,
+                    "subtotal",
+                    "total",
+                }
 
         # 2. ✨ 自動產生流水號 (僅在新建立時執行)
         if not self.pk:
@@ -231,5 +262,81 @@ class Order(models.Model):
         # 3. 若狀態變為完成/結案，且沒有時間戳記，則自動填入
         if self.status in ["completed", "final"] and not self.completed_at:
             self.completed_at = timezone.now()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "completed_at"}
+
+        # 4. 訂單與明細一起寫入；只更新狀態等欄位時不重建明細
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or "items" in update_fields:
+                self.sync_lines()
+
+    def sync_lines(self):
+        """
+        依 items 快照重建訂單明細 (OrderItem)。
+        save() 寫入 items 時會自動呼叫；補建舊訂單明細時也可單獨呼叫。
+        """
+        self.lines.all().delete()
+        OrderItem.objects.bulk_create(OrderItem.from_snapshot(self))
+
+
+# ==========================================
+# 5. 訂單明細 (OrderItem)
+# ==========================================
+class OrderItem(models.Model):
+    """
+    訂單明細：把 Order.items 的 JSON 快照展開成一列一品項，
+    報表可直接以 SQL GROUP BY 彙總，不必逐筆解析 JSON。
+    """
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="lines", verbose_name="所屬訂單"
+    )
+    # 快照中的商品 id 可能已被刪除，不建立資料庫外鍵約束
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name="+",
+        verbose_name="商品",
+    )
+    name = models.CharField(max_length=100, verbose_name="品名")
+    category = models.CharField(max_length=50, blank=True, verbose_name="分類代碼")
+    quantity = models.PositiveIntegerField(verbose_name="數量")
+    price = models.PositiveIntegerField(verbose_name="單價")
 
-        super().save(*args, **kwargs)
+    class Meta:
+        verbose_name = "訂單明細"
+        verbose_name_plural = "訂單明細"
+
+    def __str__(self):
+        return f"{self.name} x{self.quantity}"
+
+    @classmethod
+    def from_snapshot(cls, order):
+        """由訂單 items 快照產生 (未存檔的) OrderItem 清單，數量 <= 0 的品項略過"""
+        lines = []
+        if not isinstance(order.items, list):
+            return lines
+        for item in order.items:
+            try:
+                qty = int(item.get("quantity") or item.get("qty") or 0)
+                price = int(item.get("price") or 0)
+                product_id = int(item["id"]) if item.get("id") else None
+            except (ValueError, TypeError):
+                continue
+            if qty <= 0:
+                continue
+            lines.append(
+                cls(
+                    order=order,
+                    product_id=product_id,
+                    name=item.get("name") or "未知商品",
+                    category=item.get("category") or "",
+                    quantity=qty,
+                    price=price,
+                )
+            )
+        return lines
@@ -0,0 +1,30 @@
+import orjson
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    以 orjson 輸出 API 回應 (與 DRF 預設 JSONRenderer 格式相容)。
+    需要縮排時 (例如 Browsable API) 仍交回原本的 JSONRenderer 處理。
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # 無法直接序列化的型別 (Decimal、lazy 翻譯字串等) 交給 DRF 的 encoder
+        # OPT_UTC_Z：UTC 時間輸出為 "Z" 結尾 (DRF 同樣把 +00:00 改寫成 Z)
+        # OPT_NON_STR_KEYS：允許 int 等非字串 key，與標準庫 json 一樣轉成字串
+        ret = orjson.dumps(
+            data,
+            default=encoders.JSONEncoder().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+        )
+        # 與 DRF 一致：跳脫 U+2028 / U+2029，確保輸出為合法的 JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
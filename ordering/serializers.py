@@ -65,3 +65,33 @@ class OrderSerializer(serializers.ModelSerializer):
         if not isinstance(value, list):
             raise serializers.ValidationError("品項必須是列表格式")
         return value
+
+    def create(self, validated_data):
+        # store_slug 只用來找分店 (由 view 以 save(store=...) 傳入)，不是 Order 欄位
+        validated_data.pop("store_slug", None)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        # 只寫入有變更的欄位：更新狀態時不必重算金額或重建明細
+        validated_data.pop("store_slug", None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+# --- 叫號看板欄位 (不含 items)：latest 以 Meta.fields 經 values() 取資料，不逐筆序列化 ---
+class OrderBoardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "daily_serial",
+            "phone_tail",
+            "subtotal",
+            "total",
+            "status",
+            "created_at",
+            "payment_method",
+        ]
+        read_only_fields = fields
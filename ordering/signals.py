@@ -0,0 +1,30 @@
+# ordering/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Store, Order
+from .cache import invalidate_store, bump_orders_version
+
+
+@receiver(pre_save, sender=Store)
+def store_pre_save(sender, instance, **kwargs):
+    """slug 若被修改，舊 slug 的快取也要一併清除"""
+    if instance.pk:
+        old_slug = (
+            Store.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        )
+        if old_slug and old_slug != instance.slug:
+            invalidate_store(old_slug)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_changed(sender, instance, **kwargs):
+    invalidate_store(instance.slug, instance.pk)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """訂單新增 / 狀態變更 / 刪除時，讓該分店的報表與看板快取失效"""
+    bump_orders_version(instance.store_id)
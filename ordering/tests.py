@@ -1,3 +1,702 @@
-from django.test import TestCase
+import datetime
+import decimal
+from io import StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from .models import Category, Order, OrderItem, Product, Store
+from .renderers import ORJSONRenderer
+from .views import LinePayHandler, OrderViewSet
+
+REFUND_OK = {"returnCode": "0000", "info": {"refundTransactionId": "R1"}}
+
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="總店", slug="main")
+        self.product = Product.objects.create(
+            store=self.store, name="奶茶", price=50, stock=5
+        )
+
+    def make_order(self, quantity=1, **kwargs):
+        """不經過 API 直接建立訂單 (不扣庫存)"""
+        kwargs.setdefault("status", "pending")
+        return Order.objects.create(
+            store=self.store,
+            phone_tail="1234",
+            items=[
+                {
+                    "id": self.product.id,
+                    "name": self.product.name,
+                    "price": self.product.price,
+                    "quantity": quantity,
+                    "category": "other",
+                }
+            ],
+            **kwargs,
+        )
+
+    def make_linepay_order(self, transaction_id="77"):
+        """已完成 LINE Pay 付款的訂單"""
+        return self.make_order(
+            status="confirmed",
+            payment_method="linepay",
+            linepay_transaction_id=transaction_id,
+        )
+
+
+class CreateOrderTests(OrderTestCase):
+    def test_create_decrements_stock_and_builds_lines(self):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "store_slug": "main",
+                "phone_tail": "1234",
+                "payment_method": "cash",
+                "items": [{"id": self.product.id, "quantity": 2}],
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(id=response.json()["id"])
+        self.assertEqual(order.status, "pending")
+        self.assertEqual(order.total, 100)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+        line = order.lines.get()
+        self.assertEqual(line.product_id, self.product.id)
+        self.assertEqual((line.name, line.quantity, line.price), ("奶茶", 2, 50))
+
+    def test_create_rejects_insufficient_stock(self):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "store_slug": "main",
+                "phone_tail": "1234",
+                "payment_method": "cash",
+                "items": [{"id": self.product.id, "quantity": 6}],
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+    def test_status_update_keeps_lines(self):
+        order = self.make_order()
+        line_id = order.lines.get().id
+
+        order.status = "completed"
+        order.save(update_fields=["status"])
+
+        self.assertEqual(order.lines.get().id, line_id)
+        self.assertIsNotNone(Order.objects.get(id=order.id).completed_at)
+
+
+class EditOrderItemsTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("owner", "owner@example.com", "pw")
+        )
+        # 訂單 2 份，庫存已由 5 扣為 3
+        self.order = self.make_order(quantity=2)
+        Product.objects.filter(id=self.product.id).update(stock=3)
+
+    def edit(self, quantity, product_id=None):
+        return self.client.patch(
+            f"/api/orders/{self.order.id}/",
+            {"items": [{"id": product_id or self.product.id, "quantity": quantity}]},
+            content_type="application/json",
+        )
+
+    def assert_state(self, quantity, stock):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.items[0]["quantity"], quantity)
+        self.assertEqual(self.order.total, 50 * quantity)
+        self.assertEqual(self.order.lines.get().quantity, quantity)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, stock)
+
+    def test_increase_quantity(self):
+        response = self.edit(4)
+
+        self.assertEqual(response.status_code, 200)
+        self.assert_state(quantity=4, stock=1)
+
+    def test_decrease_quantity(self):
+        response = self.edit(1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assert_state(quantity=1, stock=4)
+
+    def test_rejects_more_than_stock(self):
+        response = self.edit(6)
+
+        self.assertEqual(response.status_code, 400)
+        self.assert_state(quantity=2, stock=3)
+
+    def test_rejects_unknown_product(self):
+        response = self.edit(1, product_id=9999)
+
+        self.assertEqual(response.status_code, 404)
+        self.assert_state(quantity=2, stock=3)
+
+    def test_rejects_finished_order(self):
+        Order.objects.filter(id=self.order.id).update(status="completed")
+
+        response = self.edit(1)
+
+        self.assertEqual(response.status_code, 400)
+        self.assert_state(quantity=2, stock=3)
+
+
+class CancelRefundTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("owner", "owner@example.com", "pw")
+        )
+
+    def test_overlapping_cancel_refunds_once(self):
+        order = self.make_linepay_order()
+        inner = []
+
+        def refund(handler, transaction_id, refund_amount=None):
+            # 第一個請求的退款尚未回傳時，再送出一次取消
+            if not inner:
+                inner.append(self.client.post(f"/api/orders/{order.id}/cancel/"))
+            return REFUND_OK
+
+        with mock.patch.object(
+            LinePayHandler, "refund_payment", side_effect=refund, autospec=True
+        ) as refund_payment:
+            response = self.client.post(f"/api/orders/{order.id}/cancel/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(inner[0].status_code, 400)
+        self.assertEqual(refund_payment.call_count, 1)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "cancelled")
+        self.assertTrue(order.linepay_refunded)
+        self.assertEqual(order.linepay_refund_transaction_id, "R1")
+
+    def test_failed_refund_releases_claim(self):
+        order = self.make_linepay_order()
+
+        with mock.patch.object(
+            LinePayHandler,
+            "refund_payment",
+            return_value={"returnCode": "9999", "returnMessage": "fail"},
+        ):
+            response = self.client.post(f"/api/orders/{order.id}/cancel/")
+
+        self.assertEqual(response.status_code, 400)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "confirmed")
+        self.assertFalse(order.linepay_refunded)
+
+    def test_refund_write_back_failure_is_logged_for_reconciliation(self):
+        order = self.make_linepay_order()
+
+        with mock.patch.object(
+            LinePayHandler, "refund_payment", return_value=REFUND_OK
+        ), mock.patch.object(
+            OrderViewSet, "_apply_refund", side_effect=RuntimeError("db down")
+        ), self.assertLogs(
+            "ordering.views", "ERROR"
+        ) as logs:
+            response = self.client.post(f"/api/orders/{order.id}/cancel/")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("TID: 77, 退款 TID: R1", "\n".join(logs.output))
+        order.refresh_from_db()
+        self.assertEqual(order.status, "refunding")
+
+    def test_bulk_cancel_skips_order_being_refunded(self):
+        refunding = self.make_linepay_order()
+        pending = self.make_order()
+        inner = []
+
+        def refund(handler, transaction_id, refund_amount=None):
+            if not inner:
+                inner.append(
+                    self.client.post(
+                        "/api/orders/bulk_cancel/",
+                        {"ids": [refunding.id, pending.id]},
+                        content_type="application/json",
+                    )
+                )
+            return REFUND_OK
+
+        with mock.patch.object(
+            LinePayHandler, "refund_payment", side_effect=refund, autospec=True
+        ) as refund_payment:
+            self.client.post(f"/api/orders/{refunding.id}/cancel/")
+
+        self.assertEqual(refund_payment.call_count, 1)
+        # 批次取消略過退款中的訂單，只取消另一筆
+        bulk = inner[0].json()
+        self.assertEqual(bulk["cancelled"], [pending.id])
+        self.assertEqual([f["id"] for f in bulk["failed"]], [refunding.id])
+        self.assertEqual(Order.objects.get(id=refunding.id).status, "cancelled")
+        self.assertEqual(Order.objects.get(id=pending.id).status, "cancelled")
+        self.product.refresh_from_db()
+        # 兩筆訂單各還原 1 份庫存
+        self.assertEqual(self.product.stock, 7)
+
+    def test_bulk_cancel_reports_each_order(self):
+        cash = self.make_order()
+        refunded = self.make_linepay_order("T1")
+        refund_failed = self.make_linepay_order("T2")
+        write_back_failed = self.make_linepay_order("T3")
+        done = self.make_order(status="final")
+        apply_refund = OrderViewSet._apply_refund
+
+        def refund(handler, transaction_id, refund_amount=None):
+            if transaction_id == "T2":
+                return {"returnCode": "9999", "returnMessage": "fail"}
+            return REFUND_OK
+
+        def apply(view, order_id, result):
+            if order_id == write_back_failed.id:
+                raise RuntimeError("db down")
+            return apply_refund(view, order_id, result)
+
+        with mock.patch.object(
+            LinePayHandler, "refund_payment", side_effect=refund, autospec=True
+        ), mock.patch.object(
+            OrderViewSet, "_apply_refund", side_effect=apply, autospec=True
+        ):
+            response = self.client.post(
+                "/api/orders/bulk_cancel/",
+                {
+                    "ids": [
+                        cash.id,
+                        refunded.id,
+                        refund_failed.id,
+                        write_back_failed.id,
+                        done.id,
+                        9999,
+                    ]
+                },
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertCountEqual(body["cancelled"], [cash.id, refunded.id])
+        self.assertCountEqual(
+            [f["id"] for f in body["failed"]],
+            [refund_failed.id, write_back_failed.id, done.id, 9999],
+        )
+        statuses = dict(Order.objects.values_list("id", "status"))
+        self.assertEqual(statuses[refunded.id], "cancelled")
+        # 退款失敗放回 confirmed 可重試；寫回失敗者留在 refunding 待人工對帳
+        self.assertEqual(statuses[refund_failed.id], "confirmed")
+        self.assertEqual(statuses[write_back_failed.id], "refunding")
+        self.assertEqual(statuses[done.id], "final")
+
+    def test_bulk_cancel_rejects_bad_ids(self):
+        order = self.make_order()
+
+        response = self.client.post(
+            "/api/orders/bulk_cancel/",
+            {"ids": [order.id, "abc"]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(id=order.id).status, "pending")
+
+
+class LineConfirmTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.make_order(quantity=2, payment_method="linepay")
+        self.url = f"/api/orders/line_confirm/?oid={self.order.id}&transactionId=88"
+
+    def confirm(self, **kwargs):
+        with mock.patch.object(
+            LinePayHandler, "confirm_payment", autospec=True, **kwargs
+        ) as confirm_payment:
+            response = self.client.get(self.url)
+        return response, confirm_payment
+
+    def test_success_confirms_order(self):
+        response, confirm_payment = self.confirm(return_value={"returnCode": "0000"})
+
+        self.assertRedirects(
+            response, f"/main/?oid={self.order.id}", fetch_redirect_response=False
+        )
+        confirm_payment.assert_called_once_with(mock.ANY, "88", 100)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "confirmed")
+        self.assertEqual(self.order.linepay_transaction_id, "88")
+
+    def test_failure_cancels_and_restores_stock(self):
+        response, _ = self.confirm(
+            return_value={"returnCode": "1172", "returnMessage": "fail"}
+        )
+
+        self.assertIn("error=payment_failed", response["Location"])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "cancelled")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+    def test_duplicate_callback_while_paying(self):
+        inner = []
+
+        def confirm(handler, transaction_id, amount):
+            # 第一個回調的 Confirm 尚未回傳時，LINE Pay 重送回調
+            if not inner:
+                inner.append(self.client.get(self.url))
+                inner.append(Order.objects.get(id=self.order.id).status)
+            return {"returnCode": "0000"}
+
+        response, confirm_payment = self.confirm(side_effect=confirm)
+
+        self.assertEqual(confirm_payment.call_count, 1)
+        self.assertEqual(inner[0]["Location"], f"/main/?oid={self.order.id}")
+        self.assertEqual(inner[1], "paying")
+        self.assertEqual(response["Location"], f"/main/?oid={self.order.id}")
+        self.assertEqual(Order.objects.get(id=self.order.id).status, "confirmed")
+
+    def test_error_after_claim_does_not_leave_order_paying(self):
+        response, _ = self.confirm(side_effect=RuntimeError("boom"))
+
+        self.assertIn("error=payment_failed", response["Location"])
+        self.assertEqual(Order.objects.get(id=self.order.id).status, "cancelled")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+    def test_error_after_successful_confirm_keeps_payment(self):
+        # 第二次 bump (寫回 confirmed 之後) 失敗：已扣款的訂單不可被取消
+        with mock.patch(
+            "ordering.views.bump_orders_version",
+            side_effect=[None, RuntimeError("cache down")],
+        ):
+            response, _ = self.confirm(return_value={"returnCode": "0000"})
+
+        self.assertEqual(response["Location"], f"/main/?oid={self.order.id}")
+        self.assertEqual(Order.objects.get(id=self.order.id).status, "confirmed")
+
+
+class ResetDailyOrdersTests(OrderTestCase):
+    def test_reset_skips_orders_with_linepay_call_in_progress(self):
+        self.client.force_login(
+            User.objects.create_superuser("owner", "owner@example.com", "pw")
+        )
+        pending = self.make_order(quantity=1)
+        paying = self.make_order(quantity=2, status="paying")
+        refunding = self.make_order(quantity=3, status="refunding")
+        final = self.make_order(status="final")
+
+        response = self.client.post("/api/stores/main/reset_daily/")
+
+        self.assertEqual(response.status_code, 200)
+        statuses = dict(Order.objects.values_list("id", "status"))
+        self.assertEqual(statuses[pending.id], "cancelled")
+        self.assertEqual(statuses[paying.id], "paying")
+        self.assertEqual(statuses[refunding.id], "refunding")
+        self.assertEqual(statuses[final.id], "archived")
+        # 只還原被取消的那筆
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+
+
+class DashboardStatsTests(OrderTestCase):
+    NOW = datetime.datetime(2026, 10, 16, 12, 0, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("owner", "owner@example.com", "pw")
+        )
+        Category.objects.create(store=self.store, name="甜點", slug="dessert")
+        Category.objects.create(store=self.store, name="飲料", slug="drink")
+
+    def add_order(self, status, lines, days_ago=0):
+        return Order.objects.create(
+            store=self.store,
+            phone_tail="1234",
+            status=status,
+            created_at=self.NOW - datetime.timedelta(days=days_ago),
+            items=[
+                {"name": name, "category": cat, "price": price, "quantity": qty}
+                for name, cat, price, qty in lines
+            ],
+        )
+
+    def get_stats(self):
+        # 只固定報表使用的時間，session 到期判斷仍用實際時間
+        with mock.patch(
+            "ordering.views.timezone", mock.Mock(now=mock.Mock(return_value=self.NOW))
+        ):
+            response = self.client.get("/api/orders/dashboard_stats/?store=main")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_payload(self):
+        self.add_order(
+            "completed", [("奶茶", "drink", 50, 2), ("大福", "dessert", 40, 1)]
+        )
+        self.add_order("final", [("奶茶", "drink", 50, 1), ("神秘", "", 30, 1)])
+        self.add_order("cancelled", [("奶茶", "drink", 50, 5)])
+        self.add_order("pending", [("奶茶", "drink", 50, 5)])
+        self.add_order("archived", [("大福", "dessert", 40, 2)], days_ago=3)
+        self.add_order("archived", [("大福", "dessert", 40, 9)], days_ago=30)
+
+        stats = self.get_stats()
+
+        self.assertEqual(stats["store_name"], "總店")
+        self.assertEqual(stats["update_time"], "2026-10-16 20:00:00")
+        self.assertEqual(
+            stats["today"],
+            {
+                "revenue": 220,
+                "orders": 2,
+                "items": {
+                    "dessert": {
+                        "qty": 1,
+                        "rev": 40,
+                        "name": "甜點",
+                        "details": {"大福": {"qty": 1, "rev": 40}},
+                    },
+                    "drink": {
+                        "qty": 3,
+                        "rev": 150,
+                        "name": "飲料",
+                        "details": {"奶茶": {"qty": 3, "rev": 150}},
+                    },
+                    "uncategorized": {
+                        "qty": 1,
+                        "rev": 30,
+                        "name": "其他",
+                        "details": {"神秘": {"qty": 1, "rev": 30}},
+                    },
+                },
+            },
+        )
+        self.assertEqual(stats["monthly"]["revenue"], 300)
+        self.assertEqual(stats["monthly"]["orders"], 3)
+        self.assertEqual(
+            stats["monthly"]["items"]["dessert"],
+            {
+                "qty": 3,
+                "rev": 120,
+                "name": "甜點",
+                "details": {"大福": {"qty": 3, "rev": 120}},
+            },
+        )
+        self.assertEqual(
+            stats["monthly"]["items"]["drink"], stats["today"]["items"]["drink"]
+        )
+
+    def test_new_order_invalidates_cached_stats(self):
+        self.add_order("completed", [("奶茶", "drink", 50, 1)])
+        self.assertEqual(self.get_stats()["today"]["revenue"], 50)
+
+        # 版本號在 commit 後才更新，同一分鐘內的快取也要失效
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_order("final", [("大福", "dessert", 40, 1)])
+
+        stats = self.get_stats()
+        self.assertEqual(stats["today"]["revenue"], 90)
+        self.assertEqual(stats["today"]["orders"], 2)
+
+
+class ProductBackendTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("owner", "owner@example.com", "pw")
+        )
+
+    def test_quick_update_writes_posted_fields(self):
+        response = self.client.post(
+            f"/backend/api/update/{self.product.id}/",
+            {
+                "price": "80",
+                "stock": "abc",
+                "is_active": "false",
+                "description": "少冰",
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, 80)
+        # 非數字的庫存忽略，維持原值
+        self.assertEqual(self.product.stock, 5)
+        self.assertFalse(self.product.is_active)
+        self.assertEqual(self.product.description, "少冰")
+
+    def test_quick_update_unknown_product(self):
+        self.assertEqual(
+            self.client.post("/backend/api/update/9999/", {"price": "80"}).status_code,
+            404,
+        )
+        # 沒有可更新的欄位時仍需確認商品存在
+        self.assertEqual(
+            self.client.post("/backend/api/update/9999/", {"stock": ""}).status_code,
+            404,
+        )
+
+    def test_create_product_copies_to_other_stores(self):
+        drink = Category.objects.create(store=self.store, name="飲料", slug="drink")
+        # 已有同名分類的分店沿用，沒有的自動建立；未營業的分店不複製
+        with_cat = Store.objects.create(name="二店", slug="second")
+        existing = Category.objects.create(store=with_cat, name="飲料", slug="d2")
+        without_cat = Store.objects.create(name="三店", slug="third")
+        Store.objects.create(name="四店", slug="closed", is_active=False)
+
+        response = self.client.post(
+            "/backend/api/create/",
+            {
+                "store_id": self.store.id,
+                "batch_create": "true",
+                "category": drink.id,
+                "name": "紅茶",
+                "price": "35",
+                "stock": "20",
+                "flavor_options": "微糖,無糖",
+                "is_active": "on",
+                "description": "",
+            },
+        )
+
+        self.assertRedirects(
+            response, f"/backend/?store={self.store.id}", fetch_redirect_response=False
+        )
+        created = {
+            p.store.slug: p
+            for p in Product.objects.filter(name="紅茶").select_related(
+                "store", "category"
+            )
+        }
+        self.assertEqual(set(created), {"main", "second", "third"})
+        self.assertEqual(created["main"].category, drink)
+        self.assertEqual(created["second"].category, existing)
+        new_cat = created["third"].category
+        self.assertEqual((new_cat.store, new_cat.name), (without_cat, "飲料"))
+        for product in created.values():
+            self.assertEqual(
+                (product.price, product.stock, product.flavor_options),
+                (35, 20, "微糖,無糖"),
+            )
+            self.assertTrue(product.is_active)
+
+    def test_create_product_without_batch(self):
+        Store.objects.create(name="二店", slug="second")
+
+        self.client.post(
+            "/backend/api/create/",
+            {"store_id": self.store.id, "name": "紅茶", "price": "35", "stock": "20"},
+        )
+
+        product = Product.objects.get(name="紅茶")
+        self.assertEqual(product.store, self.store)
+        self.assertIsNone(product.category)
+
+
+class BackfillOrderLinesTests(OrderTestCase):
+    def test_backfill_builds_missing_lines(self):
+        legacy = [self.make_order(quantity=2), self.make_order(quantity=3)]
+        done = self.make_order()
+        # 模擬明細表上線前建立、尚未有明細的舊訂單
+        OrderItem.objects.filter(order__in=legacy).delete()
+        done_line_id = done.lines.get().id
+
+        out = StringIO()
+        call_command("backfill_order_lines", batch_size=1, stdout=out)
+
+        self.assertIn("已補建 2 筆訂單的明細", out.getvalue())
+        self.assertEqual(
+            [o.lines.get().quantity for o in legacy],
+            [2, 3],
+        )
+        # 已有明細的訂單不會被重建
+        self.assertEqual(done.lines.get().id, done_line_id)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    DATA = {
+        "utc": datetime.datetime(
+            2026, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc
+        ),
+        "local": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=ZoneInfo("Asia/Taipei")),
+        "naive": datetime.datetime(2026, 1, 2, 3, 4, 5),
+        "date": datetime.date(2026, 1, 2),
+        "price": decimal.Decimal("1.50"),
+        1: "非字串 key",
+        "text": "a\u2028b\u2029c",
+    }
+
+    def render(self, renderer, media_type=None):
+        return renderer.render(self.DATA, media_type)
+
+    def test_matches_drf_output(self):
+        self.assertEqual(self.render(ORJSONRenderer()), self.render(JSONRenderer()))
+
+    def test_datetime_format(self):
+        body = self.render(ORJSONRenderer())
+        self.assertIn(b'"utc":"2026-01-02T03:04:05.123456Z"', body)
+        self.assertIn(b'"local":"2026-01-02T03:04:05+08:00"', body)
+        self.assertIn(b'"naive":"2026-01-02T03:04:05"', body)
+        self.assertIn(b'"1":', body)
+
+    def test_escapes_line_separators(self):
+        body = self.render(ORJSONRenderer())
+        self.assertIn(b'"text":"a\\u2028b\\u2029c"', body)
+        self.assertNotIn("\u2028".encode(), body)
+        self.assertNotIn("\u2029".encode(), body)
+
+    def test_indent_falls_back_to_drf(self):
+        media_type = "application/json; indent=4"
+        body = self.render(ORJSONRenderer(), media_type)
+        self.assertEqual(body, self.render(JSONRenderer(), media_type))
+        self.assertIn(b'\n    "utc": ', body)
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+
+class SessionRefreshMiddlewareTests(TestCase):
+    URL = "/api/stores/"
+
+    def count_session_saves(self, now):
+        with mock.patch.object(
+            SessionStore, "save", autospec=True, side_effect=SessionStore.save
+        ) as save, mock.patch("ordering.middleware.time.time", return_value=now):
+            self.client.get(self.URL)
+        return save.call_count
+
+    def test_logged_in_session_saved_once_per_interval(self):
+        self.client.force_login(User.objects.create_user("owner", password="pw"))
+
+        self.assertEqual(self.count_session_saves(now=1_000_000), 1)
+        # 間隔內的請求不寫 session
+        self.assertEqual(self.count_session_saves(now=1_000_000 + 299), 0)
+        self.assertEqual(self.count_session_saves(now=1_000_000 + 300), 1)
+
+    @mock.patch.object(SessionStore, "save", autospec=True)
+    def test_anonymous_session_never_written(self, save):
+        for _ in range(3):
+            response = self.client.get(self.URL)
+
+        save.assert_not_called()
+        self.assertNotIn("sessionid", response.cookies)
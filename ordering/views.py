@@ -1,32 +1,51 @@
 import uuid
-import json
+import orjson
 import hmac
 import hashlib
 import base64
 import requests
-import pytz
 import os
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+from requests.adapters import HTTPAdapter
 
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Max, Q, F
+from django.db.models import Sum, Max, Count, Q, F, Case, When, IntegerField, Prefetch
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.db import transaction
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
+from django.core.cache import cache
 from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control, cache_page
 
 from rest_framework.decorators import api_view
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 
 # ✅ 引入 Category
-from .models import Product, Order, Store, Category
+from .models import Product, Order, OrderItem, Store, Category, ACTIVE_ORDER_STATUSES
 from .forms import ProductForm
-from .serializers import ProductSerializer, OrderSerializer
+from .serializers import ProductSerializer, OrderSerializer, OrderBoardSerializer
+from .cache import (
+    get_store_or_404,
+    get_store_by_id_or_404,
+    get_store_list_json,
+    get_active_stores,
+    bump_orders_version,
+    dashboard_cache_key,
+    latest_cache_key,
+    order_list_cache_key,
+    DASHBOARD_CACHE_TIMEOUT,
+    LATEST_CACHE_TIMEOUT,
+    ORDER_LIST_CACHE_TIMEOUT,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -36,6 +55,9 @@ logger = logging.getLogger(__name__)
 LINE_PAY_CHANNEL_ID = os.environ.get("LINE_PAY_CHANNEL_ID")
 LINE_PAY_CHANNEL_SECRET = os.environ.get("LINE_PAY_CHANNEL_SECRET")
 LINE_PAY_SANDBOX = os.environ.get("LINE_PAY_SANDBOX", "True") == "True"
+LINE_PAY_CHANNEL_SECRET_BYTES = (LINE_PAY_CHANNEL_SECRET or "").encode("utf-8")
+# 預先以 Secret 建好 HMAC 原型，每次簽章 copy() 即可，不必重算 key pad
+LINE_PAY_HMAC = hmac.new(LINE_PAY_CHANNEL_SECRET_BYTES, digestmod=hashlib.sha256)
 
 if LINE_PAY_CHANNEL_ID or LINE_PAY_CHANNEL_SECRET:
     if not LINE_PAY_CHANNEL_ID or not LINE_PAY_CHANNEL_SECRET:
@@ -46,33 +68,65 @@ LINE_PAY_API_URL = (
     "https://sandbox-api-pay.line.me" if LINE_PAY_SANDBOX else "https://api-pay.line.me"
 )
 
+# 付款完成 / 取消後的回調網址固定走正式網域 (HTTPS)，啟動時組好前綴，只需接上訂單 id
+LINE_PAY_CALLBACK_DOMAIN = os.environ.get(
+    "LINE_PAY_CALLBACK_DOMAIN", "yibahu-order.it.com"
+)
+LINE_PAY_CONFIRM_URL = (
+    f"https://{LINE_PAY_CALLBACK_DOMAIN}/api/orders/line_confirm/?oid="
+)
+LINE_PAY_CANCEL_URL = f"https://{LINE_PAY_CALLBACK_DOMAIN}/api/orders/line_cancel/?oid="
+
+# 全模組共用的 Session：保持 keep-alive 連線池，每次呼叫不必重新 TCP + TLS 握手
+# 固定不變的標頭也放在 Session 上，每次請求只需附上 nonce 與簽章
+LINE_PAY_SESSION = requests.Session()
+LINE_PAY_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+LINE_PAY_SESSION.headers.update(
+    {
+        "Content-Type": "application/json",
+        "X-LINE-ChannelId": LINE_PAY_CHANNEL_ID,
+        "X-LINE-ChannelSecret": LINE_PAY_CHANNEL_SECRET,
+    }
+)
+
 
 class LinePayHandler:
     """處理 LINE Pay API 簽章與請求的工具類（V3）"""
 
-    def __init__(self):
-        self.base_headers = {
-            "Content-Type": "application/json",
-            "X-LINE-ChannelId": LINE_PAY_CHANNEL_ID,
-            "X-LINE-ChannelSecret": LINE_PAY_CHANNEL_SECRET,
-        }
-
-    def _get_auth_headers(self, uri, body_json: str):
+    def _get_auth_headers(self, uri, body: bytes):
         nonce = str(uuid.uuid4())
-        message = (LINE_PAY_CHANNEL_SECRET or "") + uri + body_json + nonce
-        signature = base64.b64encode(
-            hmac.new(
-                (LINE_PAY_CHANNEL_SECRET or "").encode("utf-8"),
-                message.encode("utf-8"),
-                hashlib.sha256,
-            ).digest()
-        ).decode("utf-8")
-
-        headers = self.base_headers.copy()
-        headers.update(
-            {"X-LINE-Authorization-Nonce": nonce, "X-LINE-Authorization": signature}
-        )
-        return headers
+        # 簽章訊息 = Secret + URI + Body + Nonce，逐段餵給 HMAC 以免串接大字串
+        h = LINE_PAY_HMAC.copy()
+        h.update(LINE_PAY_CHANNEL_SECRET_BYTES)
+        h.update(uri.encode("utf-8"))
+        h.update(body)
+        h.update(nonce.encode("utf-8"))
+        signature = base64.b64encode(h.digest()).decode("utf-8")
+
+        return {"X-LINE-Authorization-Nonce": nonce, "X-LINE-Authorization": signature}
+
+    def _post(self, uri, payload):
+        """簽章並送出請求；非 JSON 回應 (例如 5xx 錯誤頁) 不解析，直接回傳錯誤"""
+        body = orjson.dumps(payload)
+        headers = self._get_auth_headers(uri, body)
+
+        try:
+            res = LINE_PAY_SESSION.post(
+                f"{LINE_PAY_API_URL}{uri}",
+                headers=headers,
+                data=body,
+                timeout=10,
+            )
+        except Exception as e:
+            return {"returnCode": "HTTP_ERROR", "returnMessage": str(e)}
+
+        content_type = res.headers.get("Content-Type", "")
+        if res.status_code >= 500 or "json" not in content_type:
+            return {"returnCode": "HTTP_ERROR", "returnMessage": res.text[:500]}
+        try:
+            return orjson.loads(res.content)
+        except orjson.JSONDecodeError:
+            return {"returnCode": "HTTP_ERROR", "returnMessage": res.text[:500]}
 
     def request_payment(self, order, confirm_url, cancel_url):
         """LINE Pay Request API"""
@@ -102,32 +156,14 @@ class LinePayHandler:
             "redirectUrls": {"confirmUrl": confirm_url, "cancelUrl": cancel_url},
         }
 
-        body_json = json.dumps(payload)
-        headers = self._get_auth_headers(uri, body_json)
-
-        try:
-            res = requests.post(
-                f"{LINE_PAY_API_URL}{uri}", headers=headers, data=body_json, timeout=10
-            )
-            return res.json()
-        except Exception as e:
-            return {"returnCode": "HTTP_ERROR", "returnMessage": str(e)}
+        return self._post(uri, payload)
 
     def confirm_payment(self, transaction_id, amount):
         """LINE Pay Confirm API"""
         uri = f"/v3/payments/{transaction_id}/confirm"
         payload = {"amount": int(amount), "currency": "TWD"}
 
-        body_json = json.dumps(payload)
-        headers = self._get_auth_headers(uri, body_json)
-
-        try:
-            res = requests.post(
-                f"{LINE_PAY_API_URL}{uri}", headers=headers, data=body_json, timeout=10
-            )
-            return res.json()
-        except Exception as e:
-            return {"returnCode": "HTTP_ERROR", "returnMessage": str(e)}
+        return self._post(uri, payload)
 
     def refund_payment(self, transaction_id, refund_amount=None):
         """LINE Pay Refund API"""
@@ -136,16 +172,104 @@ class LinePayHandler:
         if refund_amount is not None:
             payload["refundAmount"] = int(refund_amount)
 
-        body_json = json.dumps(payload)
-        headers = self._get_auth_headers(uri, body_json)
+        return self._post(uri, payload)
 
+
+def _plain_rows(qs, fields, limit=None):
+    """
+    以 values() 直接取出 API 欄位，不建立 model instance、不跑 serializer；
+    created_at 沿用 DRF DateTimeField 的輸出格式，前端不需調整。
+    """
+    if limit is not None:
+        qs = qs[:limit]
+    rows = list(qs.values(*fields))
+    to_datetime = serializers.DateTimeField().to_representation
+    for row in rows:
+        row["created_at"] = to_datetime(row["created_at"])
+    return rows
+
+
+# 後台列表回傳的欄位 (store_slug 為 write_only，不輸出)
+ORDER_LIST_FIELDS = [f for f in OrderSerializer.Meta.fields if f != "store_slug"]
+
+
+def _empty_item_stats():
+    return {"qty": 0, "rev": 0}
+
+
+def _normalize_items(items):
+    """
+    把訂單 items JSON 正規化成 [(product_id, qty), ...]。
+    數量取 quantity (相容舊欄位 qty)，<= 0 或無法轉型的品項略過；
+    product_id 無法轉型時為 None，由呼叫端決定報錯或略過。
+    """
+    lines = []
+    append = lines.append
+    for item in items or ():
+        get = item.get
         try:
-            res = requests.post(
-                f"{LINE_PAY_API_URL}{uri}", headers=headers, data=body_json, timeout=10
-            )
-            return res.json()
-        except Exception as e:
-            return {"returnCode": "HTTP_ERROR", "returnMessage": str(e)}
+            qty = int(get("quantity") or get("qty") or 0)
+        except (TypeError, ValueError):
+            continue
+        if qty > 0:
+            append((_to_int(get("id")), qty))
+    return lines
+
+
+def _add_stock(qty_by_product):
+    """
+    以單一 UPDATE ... CASE WHEN 批次調整多個商品的庫存。
+    qty_by_product: {product_id: 增減數量}，product_id 需為 int 以免重複。
+    """
+    if not qty_by_product:
+        return
+    Product.objects.filter(id__in=qty_by_product).update(
+        stock=Case(
+            *[
+                When(id=product_id, then=F("stock") + qty)
+                for product_id, qty in qty_by_product.items()
+            ],
+            default=F("stock"),
+            output_field=IntegerField(),
+        )
+    )
+
+
+# 報表以台灣時間切分「今日 / 本月」，時區物件只在載入時建立一次
+TW_TZ = ZoneInfo("Asia/Taipei")
+
+# 報表統計時視為「已成交」的訂單狀態
+REPORT_FINAL_STATUSES = ["completed", "final", "archived"]
+
+
+def _iter_item_sales(store, month_start, today_start):
+    """
+    依 (分類 slug, 品名) 彙總本月已成交訂單的銷量與營收，同時算出今日部分，
+    逐列回傳 (cat, name, qty, rev, today_lines, today_qty, today_rev)。
+    直接對 OrderItem 明細表 GROUP BY，不必展開 items JSON。
+    """
+    is_today = Q(order__created_at__gte=today_start)
+    line_rev = F("quantity") * F("price")
+    return (
+        OrderItem.objects.filter(
+            order__store=store,
+            order__status__in=REPORT_FINAL_STATUSES,
+            order__created_at__gte=month_start,
+        )
+        .values("category", "name")
+        .annotate(
+            qty=Sum("quantity"),
+            rev=Sum(line_rev),
+            today_lines=Count("id", filter=is_today),
+            today_qty=Coalesce(Sum("quantity", filter=is_today), 0),
+            today_rev=Coalesce(Sum(line_rev, filter=is_today), 0),
+        )
+        .order_by()
+        .values_list(
+            "category", "name", "qty", "rev", "today_lines", "today_qty", "today_rev"
+        )
+        .iterator()
+    )
 
 
 # ==========================================
@@ -156,9 +280,14 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         store_slug = self.request.query_params.get("store")
-        qs = Product.objects.all()
+        # 序列化時會讀取 category 的 slug / name / sort_order，一併 JOIN 避免 N+1
+        qs = Product.objects.select_related("category")
         if store_slug:
-            qs = qs.filter(store__slug=store_slug)
+            # 與訂單列表相同，分店 id 由快取取得，省掉對 store 表的 JOIN
+            try:
+                qs = qs.filter(store_id=get_store_or_404(store_slug).id)
+            except Http404:
+                return qs.none()
         return qs
 
 
@@ -170,19 +299,46 @@ class OrderViewSet(viewsets.ModelViewSet):
         qs = Order.objects.all()
         store_slug = self.request.query_params.get("store")
         if store_slug:
-            qs = qs.filter(store__slug=store_slug)
-
-        from django.db.models import Q
+            # 分店由快取取得，直接以 store_id 過濾，省掉每次查詢對 store 表的 JOIN
+            try:
+                qs = qs.filter(store_id=get_store_or_404(store_slug).id)
+            except Http404:
+                return qs.none()
 
-        active_statuses = ["pending", "confirmed", "preparing", "completed", "arrived"]
         now = timezone.now()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
         # 過濾邏輯：(建立時間是今天) OR (狀態是未結案)
-        qs = qs.filter(Q(created_at__gte=today_start) | Q(status__in=active_statuses))
+        # 兩個條件分別對應 (store, created_at) 索引與 ord_active_idx 部分索引
+        qs = qs.filter(
+            Q(created_at__gte=today_start) | Q(status__in=ACTIVE_ORDER_STATUSES)
+        )
         qs = qs.exclude(status="archived")
+
         return qs.order_by("-id")
 
+    def list(self, request, *args, **kwargs):
+        """
+        後台訂單列表：老闆頁面會持續輪詢，改以 values() 回傳純資料；
+        指定分店時再以 1 秒快取合併同時間的重複請求 (訂單異動即換版本號)。
+        """
+        qs = self.filter_queryset(self.get_queryset())
+        store_slug = request.query_params.get("store")
+        if not store_slug:
+            return Response(_plain_rows(qs, ORDER_LIST_FIELDS))
+
+        try:
+            store = get_store_or_404(store_slug)
+        except Http404:
+            return Response([])
+
+        key = order_list_cache_key(store.id)
+        data = cache.get(key)
+        if data is None:
+            data = _plain_rows(qs, ORDER_LIST_FIELDS)
+            cache.set(key, data, ORDER_LIST_CACHE_TIMEOUT)
+        return Response(data)
+
     def get_permissions(self):
         if self.action in ["latest", "create", "line_confirm", "line_cancel"]:
             return [permissions.AllowAny()]
@@ -219,30 +375,35 @@ class OrderViewSet(viewsets.ModelViewSet):
                     # 1. 先「全額還原」舊訂單的庫存
                     self._restore_stock(instance)
 
-                    # 2. 重新計算新訂單內容
+                    # 2. 解析新品項，一次取回商品資料供快照使用 (不鎖定商品列)
+                    lines = _normalize_items(new_items_data)
+                    products = Product.objects.select_related("category").in_bulk(
+                        [product_id for product_id, _ in lines]
+                    )
+
+                    # 3. 重新計算新訂單內容
                     updated_items_snapshot = []
                     new_total = 0
 
-                    for item in new_items_data:
-                        product_id = item.get("id")
-                        try:
-                            qty = int(item.get("quantity") or item.get("qty") or 0)
-                        except:
-                            qty = 0
-
-                        if qty <= 0:
-                            continue
-
-                        product = Product.objects.select_for_update().get(id=product_id)
-
-                        if product.stock < qty:
+                    for product_id, qty in lines:
+                        product = products.get(product_id)
+                        if product is None:
+                            raise Product.DoesNotExist
+
+                        # 與 create 相同：以條件式 UPDATE 原子扣庫存
+                        rows_affected = Product.objects.filter(
+                            id=product.id, stock__gte=qty
+                        ).update(stock=F("stock") - qty)
+                        if rows_affected == 0:
+                            stock_left = (
+                                Product.objects.filter(id=product.id)
+                                .values_list("stock", flat=True)
+                                .first()
+                            )
                             raise ValueError(
-                                f"{product.name} 庫存不足 (剩餘 {product.stock})"
+                                f"{product.name} 庫存不足 (剩餘 {stock_left})"
                             )
 
-                        product.stock -= qty
-                        product.save()
-
                         item_copy = {
                             "id": product.id,
                             "name": product.name,
@@ -272,7 +433,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 return Response({"error": str(e)}, status=400)
             except Exception as e:
                 # 使用 logger 記錄錯誤堆疊
-                logger.error(f"修改訂單發生錯誤: {e}", exc_info=True)
+                logger.error("修改訂單發生錯誤: %s", e, exc_info=True)
                 return Response({"error": "修改失敗，請稍後再試"}, status=500)
 
         return super().partial_update(request, *args, **kwargs)
@@ -283,115 +444,125 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not items or not isinstance(items, list):
             return
 
-        # 記錄還原操作
-        logger.info(f"🔄 [庫存還原] 訂單 #{order.id}，項目數: {len(items)}")
+        # 記錄還原操作 (僅開發模式輸出)
+        logger.debug("🔄 [庫存還原] 訂單 #%s，項目數: %s", order.id, len(items))
 
-        for item in items:
-            product_id = item.get("id")
-            try:
-                qty = int(item.get("quantity") or item.get("qty") or 0)
-            except (ValueError, TypeError):
-                qty = 0
+        restore_updates = {}
+        for product_id, qty in _normalize_items(items):
+            if product_id:
+                restore_updates[product_id] = restore_updates.get(product_id, 0) + qty
 
-            if product_id and qty > 0:
-                Product.objects.filter(id=product_id).update(stock=F("stock") + qty)
+        _add_stock(restore_updates)
 
     def create(self, request, *args, **kwargs):
         store_slug = request.data.get("store_slug")
-        store = get_object_or_404(Store, slug=store_slug)
+        store = get_store_or_404(store_slug)
         items_data = request.data.get("items", [])
         payment_method = request.data.get("payment_method", "cash")
 
+        # 先驗證前端送來的欄位 (電話末碼、付款方式等)，不通過就不必鎖定商品
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            logger.error("建立訂單失敗: %s", serializer.errors)
+            return Response({"error": str(serializer.errors)}, status=400)
+
         try:
             with transaction.atomic():
-                updated_items = []
+                lines = _normalize_items(items_data)
+
+                # 同一商品可能分多行 (例如不同口味)，先合併成每個商品的總扣量
+                qty_by_id = {}
+                for product_id, qty in lines:
+                    qty_by_id[product_id] = qty_by_id.get(product_id, 0) + qty
+
+                # 一次鎖定並取回所有商品 (含分類)，依 id 排序上鎖避免死結
+                # 只改庫存不動主鍵，用 FOR NO KEY UPDATE 且只鎖商品列，不鎖 JOIN 進來的分類
+                products = (
+                    Product.objects.select_for_update(of=("self",), no_key=True)
+                    .select_related("category")
+                    .order_by("id")
+                    .in_bulk([pid for pid in qty_by_id if pid is not None])
+                )
 
-                for item in items_data:
-                    product_id = item.get("id")
-                    try:
-                        qty = int(item.get("quantity") or 0)
-                    except:
-                        qty = 0
+                # 在 Python 端一次檢查上架狀態與庫存，不必逐行往返資料庫
+                for product_id, qty in qty_by_id.items():
+                    product = products.get(product_id)
+                    if product is None:
+                        raise ValueError("商品不存在或已下架")
+                    if not product.is_active:
+                        raise ValueError(f"{product.name} 已下架")
+                    if product.stock < qty:
+                        raise ValueError(
+                            f"{product.name} 庫存不足 (剩餘 {product.stock})"
+                        )
 
-                    if qty <= 0:
-                        continue
+                # 單一 UPDATE ... CASE WHEN 扣除所有商品庫存
+                _add_stock({pid: -qty for pid, qty in qty_by_id.items()})
 
-                    # 原子鎖定扣庫存
-                    rows_affected = Product.objects.filter(
-                        id=product_id, is_active=True, stock__gte=qty
-                    ).update(stock=F("stock") - qty)
-
-                    if rows_affected == 0:
-                        p = Product.objects.filter(id=product_id).first()
-                        if p:
-                            raise ValueError(f"{p.name} 庫存不足 (剩餘 {p.stock})")
-                        else:
-                            raise ValueError("商品不存在或已下架")
-
-                    product = Product.objects.get(id=product_id)
-                    item_copy = item.copy()
-                    item_copy.update(
+                updated_items = []
+                for product_id, qty in lines:
+                    product = products[product_id]
+                    # 快照欄位固定，直接組出 dict，不必 copy() 後再 update()
+                    category = product.category if product.category_id else None
+                    updated_items.append(
                         {
+                            "id": product.id,
                             "name": product.name,
                             "price": product.price,
-                            "category": (
-                                product.category.slug if product.category else "other"
-                            ),
-                            "category_name": (
-                                product.category.name if product.category else "其他"
-                            ),
+                            "quantity": qty,
+                            "category": category.slug if category else "other",
+                            "category_name": category.name if category else "其他",
                         }
                     )
-                    updated_items.append(item_copy)
 
-                data_copy = request.data.copy()
-                data_copy["status"] = "pending"
-                data_copy["items"] = updated_items
-
-                serializer = self.get_serializer(data=data_copy)
-                if not serializer.is_valid():
-                    raise ValueError(str(serializer.errors))
-                if "store_slug" in serializer.validated_data:
-                    del serializer.validated_data["store_slug"]
-
-                order = serializer.save(store=store)
+                # 品項以伺服器端快照為準，狀態一律從 pending 開始
+                order = serializer.save(
+                    store=store, status="pending", items=updated_items
+                )
 
-                if payment_method == "linepay":
-                    line_handler = LinePayHandler()
-                    MY_DOMAIN = "yibahu-order.it.com"  # 請確認您的網址
-                    confirm_url = (
-                        f"https://{MY_DOMAIN}/api/orders/line_confirm/?oid={order.id}"
-                    )
-                    cancel_url = (
-                        f"https://{MY_DOMAIN}/api/orders/line_cancel/?oid={order.id}"
-                    )
+        except Exception as e:
+            logger.error("建立訂單失敗: %s", e, exc_info=True)
+            return Response({"error": str(e)}, status=400)
 
-                    result = line_handler.request_payment(
-                        order, confirm_url, cancel_url
-                    )
-                    if result.get("returnCode") == "0000":
-                        return Response(
-                            {
-                                "id": order.id,
-                                "daily_serial": order.daily_serial,
-                                "status": "pending",
-                                "total": order.total,
-                                "payment_method": "linepay",
-                                "payment_url": result["info"]["paymentUrl"]["web"],
-                                "items": order.items,
-                            },
-                            status=201,
-                        )
-                    else:
-                        raise ValueError(
-                            f"LINE Pay 錯誤: {result.get('returnMessage')}"
-                        )
+        if payment_method != "linepay":
+            return Response(serializer.data, status=201)
 
-                return Response(serializer.data, status=201)
+        # LINE Pay 請求必須在交易提交後才發出，避免網路延遲期間持續鎖住商品列
+        line_handler = LinePayHandler()
+        result = line_handler.request_payment(
+            order,
+            f"{LINE_PAY_CONFIRM_URL}{order.id}",
+            f"{LINE_PAY_CANCEL_URL}{order.id}",
+        )
+        if result.get("returnCode") == "0000":
+            return Response(
+                {
+                    "id": order.id,
+                    "daily_serial": order.daily_serial,
+                    "status": "pending",
+                    "total": order.total,
+                    "payment_method": "linepay",
+                    "payment_url": result["info"]["paymentUrl"]["web"],
+                    "items": order.items,
+                },
+                status=201,
+            )
 
+        # 付款請求失敗：以補償交易還原庫存並取消訂單
+        error_msg = f"LINE Pay 錯誤: {result.get('returnMessage')}"
+        logger.error("建立訂單失敗 (訂單 #%s): %s", order.id, error_msg)
+        try:
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(id=order.id)
+                if order.status == "pending":
+                    self._restore_stock(order)
+                    order.status = "cancelled"
+                    order.save(update_fields=["status"])
         except Exception as e:
-            logger.error(f"建立訂單失敗: {e}", exc_info=True)
-            return Response({"error": str(e)}, status=400)
+            logger.error(
+                "LINE Pay 失敗後還原訂單 #%s 發生錯誤: %s", order.id, e, exc_info=True
+            )
+        return Response({"error": error_msg}, status=400)
 
     @action(detail=False, methods=["get"])
     def line_confirm(self, request):
@@ -404,53 +575,94 @@ class OrderViewSet(viewsets.ModelViewSet):
             return redirect("/")
 
         try:
-            with transaction.atomic():
-                # 鎖定訂單
-                order = Order.objects.select_for_update().get(id=order_id)
-                store_slug = order.store.slug
+            # 分店 slug 由快取取得，不必 JOIN store；付款成功路徑用不到 items，不必讀取
+            order = Order.objects.only("id", "status", "total", "store_id").get(
+                id=order_id
+            )
+            store_slug = get_store_by_id_or_404(order.store_id).slug
+            success_url = f"/{store_slug}/?oid={order.id}"
+
+            # 若已確認過，直接導向成功頁面
+            if order.status == "confirmed":
+                return redirect(success_url)
+
+            if not transaction_id:
+                logger.warning("訂單 #%s 缺少 Transaction ID，將執行取消...", order_id)
+                # 缺少交易 ID 視為失敗，還原庫存
+                self._cancel_if_status(order.id, "pending")
+                return redirect(
+                    f"/{store_slug}/?error=missing_transaction&oid={order.id}"
+                )
 
-                # 若已確認過，直接導向成功頁面
-                if order.status == "confirmed":
-                    return redirect(f"/{store_slug}/?oid={order.id}")
+            # 以條件式 UPDATE 搶下訂單：只有仍為 pending 的訂單會被標記為付款確認中，
+            # 重複的回調拿不到這筆訂單，也就不會重複呼叫 Confirm API；不必在網路往返期間鎖住訂單。
+            # Confirm 回傳成功前不標記為 confirmed，避免店家提早製作或發起退款
+            claimed = Order.objects.filter(id=order.id, status="pending").update(
+                status="paying",
+                payment_method="linepay",
+                linepay_transaction_id=str(transaction_id),
+            )
+            if not claimed:
+                current_status = (
+                    Order.objects.filter(id=order.id)
+                    .values_list("status", flat=True)
+                    .first()
+                )
+                # 另一個回調正在確認中時，成功頁面會輪詢到最終狀態
+                if current_status in ("paying", "confirmed"):
+                    return redirect(success_url)
+                return redirect(f"/{store_slug}/?error=cancelled&oid={order.id}")
 
-                if not transaction_id:
-                    logger.warning(
-                        f"訂單 #{order_id} 缺少 Transaction ID，將執行取消..."
-                    )
-                    # 缺少交易 ID 視為失敗，還原庫存
-                    self._restore_stock(order)
-                    order.status = "cancelled"
-                    order.save()
-                    return redirect(
-                        f"/{store_slug}/?error=missing_transaction&oid={order.id}"
-                    )
+            # 搶下訂單後任何例外都要把訂單從 paying 移走，否則會一直佔住庫存；
+            # 但 LINE Pay 已扣款時不可取消，改記錄交易編號供人工對帳
+            result = {}
+            try:
+                # update() 不會觸發 post_save，手動讓看板快取失效
+                bump_orders_version(order.store_id)
 
-                # 呼叫 LINE Pay 確認 API
-                line_handler = LinePayHandler()
-                result = line_handler.confirm_payment(transaction_id, order.total)
+                # 呼叫 LINE Pay 確認 API (在交易外執行)
+                result = LinePayHandler().confirm_payment(transaction_id, order.total)
 
                 # 記錄回傳結果
                 logger.info(
-                    f"LINE Pay Confirm 結果 (訂單 #{order.id}): Code={result.get('returnCode')} Msg={result.get('returnMessage')}"
+                    "LINE Pay Confirm 結果 (訂單 #%s): Code=%s Msg=%s",
+                    order.id,
+                    result.get("returnCode"),
+                    result.get("returnMessage"),
                 )
 
-                if result and result.get("returnCode") == "0000":
-                    order.status = "confirmed"
-                    order.payment_method = "linepay"
-                    order.linepay_transaction_id = str(transaction_id)
-                    order.save()
-                    return redirect(f"/{store_slug}/?oid={order.id}")
+                if result.get("returnCode") == "0000":
+                    if Order.objects.filter(id=order.id, status="paying").update(
+                        status="confirmed"
+                    ):
+                        bump_orders_version(order.store_id)
+                    return redirect(success_url)
 
-                # 付款失敗處理
-                logger.error(f"LINE Pay 付款失敗 (訂單 #{order.id}): {result}")
-                self._restore_stock(order)
-                order.status = "cancelled"
-                order.save()
-                return redirect(f"/{store_slug}/?error=payment_failed&oid={order.id}")
+                # 付款失敗處理：補償交易還原庫存並取消
+                logger.error("LINE Pay 付款失敗 (訂單 #%s): %s", order.id, result)
+            except Exception as e:
+                if result.get("returnCode") == "0000":
+                    logger.error(
+                        "❌ LINE Pay 已扣款但寫回訂單失敗，需人工對帳: 訂單 #%s, TID: %s, 錯誤: %s",
+                        order.id,
+                        transaction_id,
+                        e,
+                        exc_info=True,
+                    )
+                    return redirect(success_url)
+                logger.error(
+                    "LINE Confirm 處理失敗，取消訂單 #%s (TID: %s): %s",
+                    order.id,
+                    transaction_id,
+                    e,
+                    exc_info=True,
+                )
+            self._cancel_if_status(order.id, "paying")
+            return redirect(f"/{store_slug}/?error=payment_failed&oid={order.id}")
 
         except Exception as e:
             logger.error(
-                f"LINE Confirm 伺服器錯誤 (訂單 {order_id}): {e}", exc_info=True
+                "LINE Confirm 伺服器錯誤 (訂單 %s): %s", order_id, e, exc_info=True
             )
             return redirect(f"/?error=server_error")
 
@@ -465,30 +677,30 @@ class OrderViewSet(viewsets.ModelViewSet):
         try:
             with transaction.atomic():
                 order = Order.objects.select_for_update().get(id=order_id)
-                store_slug = order.store.slug
+                store_slug = get_store_by_id_or_404(order.store_id).slug
 
                 if order.status == "confirmed":
                     logger.info(
-                        f"LINE Cancel 回調: 訂單 #{order.id} 實際上已付款成功，導向成功頁面。"
+                        "LINE Cancel 回調: 訂單 #%s 實際上已付款成功，導向成功頁面。",
+                        order.id,
                     )
                     return redirect(f"/{store_slug}/?oid={order.id}")
 
                 if order.status == "pending":
-                    logger.info(f"LINE Cancel 回調: 取消未付款訂單 #{order.id}")
+                    logger.info("LINE Cancel 回調: 取消未付款訂單 #%s", order.id)
                     self._restore_stock(order)
                     order.status = "cancelled"
-                    order.save()
+                    order.save(update_fields=["status"])
 
                 return redirect(f"/{store_slug}/?error=cancelled&oid={order.id}")
 
         except Order.DoesNotExist:
-            logger.warning(f"LINE Cancel 回調: 找不到訂單 ID {order_id}")
+            logger.warning("LINE Cancel 回調: 找不到訂單 ID %s", order_id)
             return redirect("/")
 
         except Exception as e:
             logger.error(
-                f"LINE Cancel 回調發生錯誤 (訂單 {order_id}): {str(e)}",
-                exc_info=True,
+                "LINE Cancel 回調發生錯誤 (訂單 %s): %s", order_id, e, exc_info=True
             )
             return redirect(f"/?error=cancel_failed")
 
@@ -501,80 +713,259 @@ class OrderViewSet(viewsets.ModelViewSet):
                 order = Order.objects.select_for_update().get(id=pk)
 
                 # 2. 檢查狀態
+                if order.status == "refunding":
+                    return Response({"error": "此訂單正在處理退款"}, status=400)
                 if order.status not in ["pending", "confirmed"]:
                     logger.warning(
-                        f"使用者取消失敗: 訂單 #{order.id} 狀態為 '{order.status}'，不可取消"
+                        "使用者取消失敗: 訂單 #%s 狀態為 '%s'，不可取消",
+                        order.id,
+                        order.status,
                     )
                     return Response(
                         {"error": "此訂單狀態無法取消，請聯繫店家"}, status=400
                     )
 
-                # 3. 處理 LINE Pay 退款
-                if order.payment_method == "linepay" and order.status == "confirmed":
-                    if not order.linepay_transaction_id:
-                        logger.error(
-                            f"退款失敗: 訂單 #{order.id} (LINE Pay) 已確認但無交易編號"
-                        )
-                        return Response(
-                            {"error": "找不到交易編號，無法自動退款，請聯繫客服"},
-                            status=400,
-                        )
-
-                    logger.info(
-                        f"🔄 執行 LINE Pay 退款: 訂單 #{order.id}, TID: {order.linepay_transaction_id}"
+                # 3. 不需退款的訂單：直接還原庫存並取消
+                if not (
+                    order.payment_method == "linepay" and order.status == "confirmed"
+                ):
+                    self._restore_stock(order)
+                    order.status = "cancelled"
+                    order.save(update_fields=["status"])
+                    logger.info("訂單 #%s 已由使用者成功取消", order.id)
+                    return Response(
+                        {"status": "success", "detail": "訂單已取消並完成退款"}
                     )
 
-                    line_handler = LinePayHandler()
-                    result = line_handler.refund_payment(order.linepay_transaction_id)
+                if not order.linepay_transaction_id:
+                    logger.error(
+                        "退款失敗: 訂單 #%s (LINE Pay) 已確認但無交易編號", order.id
+                    )
+                    return Response(
+                        {"error": "找不到交易編號，無法自動退款，請聯繫客服"},
+                        status=400,
+                    )
+                transaction_id = order.linepay_transaction_id
 
-                    # 檢查 LINE Pay 結果
-                    if result.get("returnCode") != "0000":
-                        error_msg = result.get("returnMessage", "未知錯誤")
-                        error_code = result.get("returnCode", "N/A")
+                # 4. 先把訂單標記為退款中再釋放鎖，重複點擊或後台同時取消都拿不到這筆訂單
+                if not self._claim_refund(order):
+                    return Response({"error": "此訂單正在處理退款"}, status=400)
 
-                        logger.error(
-                            f"❌ LINE Pay 退款 API 失敗: 訂單 #{order.id}, Code: {error_code}, Msg: {error_msg}"
-                        )
+            # 5. LINE Pay 退款 (在交易外執行，避免網路延遲期間鎖住訂單)
+            logger.info("🔄 執行 LINE Pay 退款: 訂單 #%s, TID: %s", pk, transaction_id)
+            result = LinePayHandler().refund_payment(transaction_id)
 
-                        return Response(
-                            {"error": f"退款失敗: {error_msg}，請聯繫客服處理"},
-                            status=400,
-                        )
+            if result.get("returnCode") != "0000":
+                error_msg = result.get("returnMessage", "未知錯誤")
+                error_code = result.get("returnCode", "N/A")
 
-                    logger.info(f"✅ LINE Pay 退款成功: 訂單 #{order.id}")
+                logger.error(
+                    "❌ LINE Pay 退款 API 失敗: 訂單 #%s, Code: %s, Msg: %s",
+                    pk,
+                    error_code,
+                    error_msg,
+                )
+                self._release_refund(order)
 
-                # 4. 還原庫存
-                self._restore_stock(order)
+                return Response(
+                    {"error": f"退款失敗: {error_msg}，請聯繫客服處理"},
+                    status=400,
+                )
 
-                # 5. 更新狀態
-                order.status = "cancelled"
-                order.save()
+            logger.info("✅ LINE Pay 退款成功: 訂單 #%s", pk)
 
-                logger.info(f"訂單 #{order.id} 已由使用者成功取消")
+            # 6. 退款成功後再開短交易寫回退款資訊、還原庫存並取消
+            if not self._finish_refund(pk, transaction_id, result):
+                return Response(
+                    {"error": "退款已完成，但訂單狀態更新失敗，請聯繫店家"},
+                    status=500,
+                )
+            logger.info("訂單 #%s 已由使用者成功取消", pk)
 
             return Response({"status": "success", "detail": "訂單已取消並完成退款"})
 
         except Order.DoesNotExist:
-            logger.warning(f"取消請求失敗: 找不到訂單 ID {pk}")
+            logger.warning("取消請求失敗: 找不到訂單 ID %s", pk)
             return Response({"error": "找不到該訂單"}, status=404)
 
         except Exception as e:
             # 捕捉所有未預期錯誤，exc_info=True 記錄 Traceback
+            logger.error("❌ 處理訂單 #%s 取消時發生系統錯誤: %s", pk, e, exc_info=True)
+            return Response({"error": "系統發生錯誤，請稍後再試"}, status=500)
+
+    @action(detail=False, methods=["post"], url_path="bulk_cancel")
+    def bulk_cancel(self, request):
+        """管理員批次取消訂單 (LINE Pay 退款以多執行緒並行送出)"""
+        order_ids = request.data.get("ids")
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response({"error": "請提供訂單 ID 列表"}, status=400)
+        try:
+            order_ids = list(dict.fromkeys(int(oid) for oid in order_ids))
+        except (TypeError, ValueError):
+            return Response({"error": "訂單 ID 格式錯誤"}, status=400)
+
+        cancelled, failed, to_refund = [], [], []
+
+        # 1. 短交易：不需退款的訂單直接取消，需退款者先標記為退款中 (與 cancel 共用)
+        with transaction.atomic():
+            orders = list(Order.objects.select_for_update().filter(id__in=order_ids))
+            found = {order.id for order in orders}
+            failed.extend(
+                {"id": oid, "error": "找不到該訂單"}
+                for oid in order_ids
+                if oid not in found
+            )
+            for order in orders:
+                if order.status not in ["pending", "confirmed"]:
+                    failed.append({"id": order.id, "error": "此訂單狀態無法取消"})
+                elif order.payment_method == "linepay" and order.status == "confirmed":
+                    if not order.linepay_transaction_id:
+                        failed.append({"id": order.id, "error": "找不到交易編號"})
+                    elif self._claim_refund(order):
+                        to_refund.append((order, order.linepay_transaction_id))
+                    else:
+                        failed.append({"id": order.id, "error": "此訂單正在處理退款"})
+                else:
+                    self._restore_stock(order)
+                    order.status = "cancelled"
+                    order.save(update_fields=["status"])
+                    cancelled.append(order.id)
+
+        # 2. 交易外並行呼叫 LINE Pay 退款：N 筆退款只需約一次網路往返的時間
+        if to_refund:
+            line_handler = LinePayHandler()
+            with ThreadPoolExecutor(max_workers=min(len(to_refund), 8)) as pool:
+                results = pool.map(
+                    lambda pair: line_handler.refund_payment(pair[1]), to_refund
+                )
+
+                # 3. 逐筆寫回退款結果 (失敗者放回 confirmed，可再重試)
+                for (order, tid), result in zip(to_refund, results):
+                    if result.get("returnCode") != "0000":
+                        logger.error(
+                            "❌ 批次退款失敗: 訂單 #%s, TID: %s, Code: %s, Msg: %s",
+                            order.id,
+                            tid,
+                            result.get("returnCode"),
+                            result.get("returnMessage"),
+                        )
+                        self._release_refund(order)
+                        failed.append(
+                            {"id": order.id, "error": result.get("returnMessage")}
+                        )
+                        continue
+                    # 寫回失敗的訂單已退款但仍為 refunding，由 _finish_refund 記錄供人工對帳
+                    if self._finish_refund(order.id, tid, result):
+                        cancelled.append(order.id)
+                    else:
+                        failed.append(
+                            {"id": order.id, "error": "退款已完成，但訂單狀態更新失敗"}
+                        )
+
+        logger.info("批次取消完成: 成功 %s 筆，失敗 %s 筆", len(cancelled), len(failed))
+        return Response({"cancelled": cancelled, "failed": failed})
+
+    def _claim_refund(self, order):
+        """
+        以條件式 UPDATE 把已付款的 LINE Pay 訂單改為 refunding，搶到的請求才呼叫退款 API；
+        併發的取消請求 (重複點擊、後台批次取消) 不會對同一筆交易重複退款。
+        """
+        claimed = Order.objects.filter(
+            id=order.id,
+            status="confirmed",
+            payment_method="linepay",
+            linepay_refunded=False,
+        ).update(status="refunding")
+        if claimed:
+            # update() 不會觸發 post_save，手動讓看板快取失效
+            bump_orders_version(order.store_id)
+        return bool(claimed)
+
+    def _release_refund(self, order):
+        """退款 API 失敗：把訂單放回 confirmed，之後可以再次取消重試"""
+        if Order.objects.filter(id=order.id, status="refunding").update(
+            status="confirmed"
+        ):
+            bump_orders_version(order.store_id)
+
+    def _cancel_if_status(self, order_id, status):
+        """以短交易鎖定訂單，若仍為指定狀態則還原庫存並取消 (避免重複還原)"""
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(id=order_id)
+            if order.status != status:
+                return False
+            self._restore_stock(order)
+            order.status = "cancelled"
+            order.save(update_fields=["status"])
+        return True
+
+    def _finish_refund(self, order_id, transaction_id, result):
+        """
+        退款成功後寫回結果。寫回失敗時 LINE Pay 已退款、訂單卻仍為 refunding，
+        以 error 記錄交易與退款編號，供人工對帳後於後台把訂單改為已取消。
+        """
+        try:
+            self._apply_refund(order_id, result)
+        except Exception as e:
             logger.error(
-                f"❌ 處理訂單 #{pk} 取消時發生系統錯誤: {str(e)}",
+                "❌ 退款已完成但寫回訂單失敗，需人工對帳: 訂單 #%s, TID: %s, 退款 TID: %s, 錯誤: %s",
+                order_id,
+                transaction_id,
+                (result.get("info") or {}).get("refundTransactionId"),
+                e,
                 exc_info=True,
             )
-            return Response({"error": "系統發生錯誤，請稍後再試"}, status=500)
+            return False
+        return True
+
+    def _apply_refund(self, order_id, result):
+        """記錄 LINE Pay 退款結果，並將訂單取消 (已取消者不重複還原庫存)"""
+        refund_tid = (result.get("info") or {}).get("refundTransactionId")
+
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(id=order_id)
+            order.linepay_refunded = True
+            if refund_tid:
+                order.linepay_refund_transaction_id = str(refund_tid)
+            if order.status != "cancelled":
+                self._restore_stock(order)
+                order.status = "cancelled"
+            order.save(
+                update_fields=[
+                    "status",
+                    "linepay_refunded",
+                    "linepay_refund_transaction_id",
+                ]
+            )
+        return order
 
     @action(detail=False, methods=["get"])
     def latest(self, request):
         store_slug = request.query_params.get("store")
         qs = self.get_queryset()
-        if store_slug:
-            qs = qs.filter(store__slug=store_slug)
-        orders = qs.order_by("-id")[:30]
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        if not store_slug:
+            return Response(self._board_rows(qs))
+
+        try:
+            store = get_store_or_404(store_slug)
+        except Http404:
+            return Response([])
+
+        # 叫號看板每幾秒輪詢一次，短暫快取；訂單異動時版本號改變會立即失效
+        key = latest_cache_key(store.id)
+        data = cache.get(key)
+        if data is None:
+            data = self._board_rows(qs)
+            cache.set(key, data, LATEST_CACHE_TIMEOUT)
+        return Response(data)
+
+    @staticmethod
+    def _board_rows(qs):
+        """
+        叫號看板資料：以 values() 只取看板欄位 (不含 items JSON)，
+        跳過 DRF serializer 逐欄位轉換；時間格式沿用 DRF 的 DateTimeField。
+        """
+        return _plain_rows(qs.order_by("-id"), OrderBoardSerializer.Meta.fields, 30)
 
     @action(detail=False, methods=["get"])
     def dashboard_stats(self, request):
@@ -583,84 +974,117 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not store_slug:
             return Response({"error": "請提供 store 參數"}, status=400)
 
-        store = get_object_or_404(Store, slug=store_slug)
-        categories = Category.objects.filter(store=store).order_by("sort_order")
+        store = get_store_or_404(store_slug)
+
+        now_tw = timezone.now().astimezone(TW_TZ)
 
-        tw_tz = pytz.timezone("Asia/Taipei")
-        now_tw = timezone.now().astimezone(tw_tz)
+        # 以 (分店, 訂單版本, 分鐘) 為 key 快取整份報表，後台輪詢時直接回傳
+        cache_key = dashboard_cache_key(store.id, now_tw.strftime("%Y%m%d%H%M"))
+        cached_body = cache.get(cache_key)
+        if cached_body is not None:
+            return HttpResponse(cached_body, content_type="application/json")
+
+        categories = Category.objects.filter(store=store).order_by("sort_order")
         today_start = now_tw.replace(hour=0, minute=0, second=0, microsecond=0)
         month_start = now_tw.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        def calculate_metrics(queryset):
-            final_qs = queryset.filter(status__in=["completed", "final", "archived"])
-            total_rev = final_qs.aggregate(Sum("total"))["total__sum"] or 0
-            total_count = final_qs.count()
-
+        def new_items_stats():
+            # details 以 defaultdict 建立，省去每個品項的 membership 判斷
             items_stats = {}
             for cat in categories:
                 items_stats[cat.slug] = {
                     "qty": 0,
                     "rev": 0,
                     "name": cat.name,
-                    "details": {},
+                    "details": defaultdict(_empty_item_stats),
                 }
             items_stats["uncategorized"] = {
                 "qty": 0,
                 "rev": 0,
                 "name": "其他",
-                "details": {},
+                "details": defaultdict(_empty_item_stats),
             }
+            return items_stats
+
+        def add_sales(items_stats, cat_slug, name, qty, rev):
+            target_stats = items_stats.get(cat_slug) or items_stats["uncategorized"]
+            target_stats["qty"] += qty
+            target_stats["rev"] += rev
+
+            detail = target_stats["details"][name]
+            detail["qty"] += qty
+            detail["rev"] += rev
+
+        def calculate_metrics():
+            """今日與本月 (今日 ⊂ 本月) 在同一次掃描中算完"""
+            is_today = Q(created_at__gte=today_start)
+            agg = Order.objects.filter(
+                store=store,
+                created_at__gte=month_start,
+                status__in=REPORT_FINAL_STATUSES,
+            ).aggregate(
+                m_rev=Sum("total"),
+                m_count=Count("id"),
+                d_rev=Sum("total", filter=is_today),
+                d_count=Count("id", filter=is_today),
+            )
 
-            for order in final_qs:
-                for item in order.items or []:
-                    cat_slug = item.get("category", "uncategorized")
-                    p_name = item.get("name", "未知商品")
-                    qty = int(item.get("quantity") or item.get("qty", 0))
-                    price = int(item.get("price", 0))
-                    subtotal = price * qty
-
-                    target_stats = items_stats.get(
-                        cat_slug, items_stats["uncategorized"]
-                    )
-                    target_stats["qty"] += qty
-                    target_stats["rev"] += subtotal
-
-                    details = target_stats["details"]
-                    if p_name not in details:
-                        details[p_name] = {"qty": 0, "rev": 0}
-
-                    details[p_name]["qty"] += qty
-                    details[p_name]["rev"] += subtotal
-
-            return total_rev, total_count, items_stats
-
-        base_qs = Order.objects.filter(store=store)
-        d_rev, d_count, d_items = calculate_metrics(
-            base_qs.filter(created_at__gte=today_start)
-        )
-        m_rev, m_count, m_items = calculate_metrics(
-            base_qs.filter(created_at__gte=month_start)
-        )
+            # 品項已在 _iter_item_sales 依 (分類, 品名) 彙總，這裡只需組裝巢狀結構
+            d_items = new_items_stats()
+            m_items = new_items_stats()
+            for (
+                cat_slug,
+                name,
+                qty,
+                rev,
+                today_lines,
+                today_qty,
+                today_rev,
+            ) in _iter_item_sales(store, month_start, today_start):
+                add_sales(m_items, cat_slug, name, qty, rev)
+                if today_lines:
+                    add_sales(d_items, cat_slug, name, today_qty, today_rev)
+
+            today = {
+                "revenue": agg["d_rev"] or 0,
+                "orders": agg["d_count"],
+                "items": d_items,
+            }
+            monthly = {
+                "revenue": agg["m_rev"] or 0,
+                "orders": agg["m_count"],
+                "items": m_items,
+            }
+            return today, monthly
 
-        return Response(
+        # 先算完整份報表再回應：計算中出錯時仍能回傳錯誤狀態碼，而不是已送出 200 的半截 JSON
+        today, monthly = calculate_metrics()
+        body = orjson.dumps(
             {
                 "store_name": store.name,
-                "today": {"revenue": d_rev, "orders": d_count, "items": d_items},
-                "monthly": {"revenue": m_rev, "orders": m_count, "items": m_items},
+                "today": today,
+                "monthly": monthly,
                 "update_time": now_tw.strftime("%Y-%m-%d %H:%M:%S"),
             }
         )
+        cache.set(cache_key, body, DASHBOARD_CACHE_TIMEOUT)
+        return HttpResponse(body, content_type="application/json")
 
 
+@cache_control(max_age=60)
 def store_list(request):
     """回傳所有營業中的分店清單，供後台選擇器使用"""
-    stores = Store.objects.filter(is_active=True).values("name", "slug")
-    return JsonResponse(list(stores), safe=False)
+    return HttpResponse(get_store_list_json(), content_type="application/json")
 
 
 # ==========================================
 # 3. 頁面視圖 (HTML)
 # ==========================================
+# 公開的純模板頁面 (資料都由前端再打 API 取得) 整頁快取 60 秒；
+# 需登入的頁面 (owner、報表) 不可跨使用者共用快取，也不能讓代理伺服器保存，因此不加
+PAGE_CACHE_TIMEOUT = 60
+
+
 @login_required(login_url="/admin/login/")
 def owner_dashboard(request):
     return render(request, "ordering/owner.html")
@@ -671,59 +1095,62 @@ def report_dashboard(request):
     return render(request, "ordering/dashboard.html")
 
 
+@cache_page(PAGE_CACHE_TIMEOUT)
 def index(request, store_slug):
-    store = get_object_or_404(Store, slug=store_slug)
+    store = get_store_or_404(store_slug)
     return render(request, "ordering/index.html", {"store": store})
 
 
+@cache_page(PAGE_CACHE_TIMEOUT)
 def order_status_board(request, store_slug):
-    store = get_object_or_404(Store, slug=store_slug)
+    store = get_store_or_404(store_slug)
     return render(request, "ordering/status.html", {"store": store})
 
 
+@cache_page(PAGE_CACHE_TIMEOUT)
 def about(request):
-    stores = Store.objects.filter(is_active=True)
-    return render(request, "about.html", {"stores": stores})
+    return render(request, "about.html", {"stores": get_active_stores()})
 
 
 # views.py 中的 reset_daily_orders
 @api_view(["POST"])
 def reset_daily_orders(request, store_slug):
-    store = get_object_or_404(Store, slug=store_slug)
+    store = get_store_or_404(store_slug)
 
     # 1. 找出需要取消的訂單
+    # paying / refunding 的 LINE Pay 呼叫仍在進行中，交給回調與退款流程處理，不在此取消
     pending_orders = Order.objects.filter(
         store=store,
-        status__in=["pending", "confirmed", "preparing", "completed", "arrived"],
-    )
+        status__in=ACTIVE_ORDER_STATUSES,
+    ).exclude(status__in=("paying", "refunding"))
 
-    cancel_count = 0
     restore_updates = {}  # 用 dict 來合併同一商品的庫存 {product_id: qty_to_add}
 
     with transaction.atomic():
-        # A. 計算要還原的總庫存
-        for order in pending_orders:
-            items = order.items  # JSONField 自動轉 list
-            if isinstance(items, list):
-                for item in items:
-                    pid = item.get("id")
-                    qty = int(item.get("quantity") or item.get("qty") or 0)
-                    if pid and qty > 0:
+        # A. 鎖定待取消訂單，只取 id 與 items，不建立 Order 物件
+        rows = list(pending_orders.select_for_update().values_list("id", "items"))
+        pending_ids = []
+        for order_id, items in rows:
+            pending_ids.append(order_id)
+            if isinstance(items, list):  # JSONField 自動轉 list
+                for pid, qty in _normalize_items(items):
+                    if pid:
                         restore_updates[pid] = restore_updates.get(pid, 0) + qty
 
-            # 標記訂單為取消
-            order.status = "cancelled"
-            order.save()
-            cancel_count += 1
+        # B. 一次 UPDATE 標記所有訂單為取消
+        cancel_count = Order.objects.filter(id__in=pending_ids).update(
+            status="cancelled"
+        )
 
-        # B. 批量更新商品庫存 (減少 DB連線次數)
-        for pid, qty_to_add in restore_updates.items():
-            Product.objects.filter(id=pid).update(stock=F("stock") + qty_to_add)
+        # C. 批量更新商品庫存 (單一 UPDATE 完成)
+        _add_stock(restore_updates)
 
     # 2. 處理已完成 -> 歸檔
     archived_count = Order.objects.filter(store=store, status="final").update(
         status="archived"
     )
+    # QuerySet.update() 不會觸發 post_save，需手動讓看板 / 報表快取失效
+    bump_orders_version(store.id)
 
     return Response(
         {
@@ -739,21 +1166,25 @@ def mobile_admin(request):
     功能: 顯示手機版管理介面
     """
     # 1. 取得分店 (支援 ?store=ID 切換)
-    stores = Store.objects.filter(is_active=True)
+    stores = get_active_stores()
     current_store_id = request.GET.get("store")
 
     # 預設選第一間，或者選網址參數指定的那間
     if current_store_id:
-        current_store = get_object_or_404(Store, id=current_store_id)
+        current_store = get_store_by_id_or_404(current_store_id)
     else:
-        current_store = stores.first()
+        current_store = stores[0] if stores else None
 
     if not current_store:
         return HttpResponse("請先至 Django Admin 後台建立至少一間分店")
 
     # 2. 取得分類與商品
     # 這裡依照您的 Model 結構，Category 有 store 外鍵
-    categories = Category.objects.filter(store=current_store).order_by("sort_order")
+    categories = (
+        Category.objects.filter(store=current_store)
+        .select_related("store")
+        .order_by("sort_order")
+    )
 
     # 取得篩選參數
     current_cat_id = request.GET.get("category")
@@ -786,34 +1217,33 @@ def quick_update_product(request, pk):
     對應網址: /backend/api/update/<pk>/
     功能: HTMX 快速更新 (不刷新頁面)
     """
-    product = get_object_or_404(Product, pk=pk)
+    # 只收集有傳入的欄位，以單一 UPDATE 寫回，不必先 SELECT 整列再全欄位 save()
+    updates = {}
 
-    # 1. 更新價格 (轉型為 int)
+    # 1. 更新價格 (轉型為 int，亂七八糟的值就忽略)
     if "price" in request.POST:
-        # 使用你原本定義的 _to_int 或是直接 try-except
-        try:
-            product.price = int(request.POST.get("price"))
-        except (ValueError, TypeError):
-            pass  # 如果傳來亂七八糟的值，就忽略
+        price = _to_int(request.POST.get("price"))
+        if price is not None:
+            updates["price"] = price
 
-    # 2. 更新庫存 (🔥 關鍵修正：必須轉型為 int)
+    # 2. 更新庫存 (🔥 關鍵修正：必須轉型為 int，忽略非數字輸入)
     if "stock" in request.POST:
-        try:
-            val = int(request.POST.get("stock"))
-            product.stock = val
-        except (ValueError, TypeError):
-            pass  # 忽略非數字輸入
+        stock = _to_int(request.POST.get("stock"))
+        if stock is not None:
+            updates["stock"] = stock
 
     # 3. 更新上下架
     if "is_active" in request.POST:
-        val = request.POST.get("is_active")
         # HTMX 傳來的會是字串 "true" 或 "false"
-        product.is_active = val == "true"
+        updates["is_active"] = request.POST.get("is_active") == "true"
 
     if "description" in request.POST:
-        product.description = request.POST.get("description")
+        updates["description"] = request.POST.get("description")
 
-    product.save()  # 現在這裡是 int，Model 裡的 <= 0 判斷就不會報錯了
+    qs = Product.objects.filter(pk=pk)
+    found = qs.update(**updates) if updates else qs.exists()
+    if not found:
+        raise Http404
     return HttpResponse("", status=200)
 
 
@@ -821,7 +1251,7 @@ def quick_update_product(request, pk):
 def create_product(request):
     # 1. 取得基本資料
     current_store_id = request.POST.get("store_id")
-    current_store = get_object_or_404(Store, id=current_store_id)
+    current_store = get_store_by_id_or_404(current_store_id)
 
     # 2. 檢查是否有勾選「批量建立」
     is_batch = request.POST.get("batch_create") == "true"
@@ -840,8 +1270,10 @@ def create_product(request):
                 # B. 如果勾選批量，開始複製到其他分店
                 if is_batch:
                     # 找出所有"其他"營業中的分店
-                    other_stores = Store.objects.filter(is_active=True).exclude(
-                        id=current_store_id
+                    other_stores = list(
+                        Store.objects.filter(is_active=True).exclude(
+                            id=current_store_id
+                        )
                     )
 
                     # 取得原始分類名稱 (用來去別間店找對應)
@@ -851,39 +1283,47 @@ def create_product(request):
                         else None
                     )
 
-                    for target_store in other_stores:
-                        target_category = None
-
-                        # 處理分類對應
-                        if source_cat_name:
-                            # 嘗試在目標分店找同名分類，找不到就自動建立！
-                            # slug 隨機產生或是用名稱轉碼皆可，這裡簡化用 uuid 避免衝突
-                            import uuid
-
-                            target_category, _ = Category.objects.get_or_create(
+                    # 處理分類對應：一次查出各分店的同名分類，找不到的一次建立
+                    target_categories = {}
+                    if source_cat_name:
+                        for cat in Category.objects.filter(
+                            store__in=other_stores, name=source_cat_name
+                        ).order_by("id"):
+                            target_categories.setdefault(cat.store_id, cat)
+
+                        # slug 隨機產生或是用名稱轉碼皆可，這裡簡化用 uuid 避免衝突
+                        new_categories = [
+                            Category(
                                 store=target_store,
                                 name=source_cat_name,
-                                defaults={
-                                    "slug": f"auto_{uuid.uuid4().hex[:6]}",
-                                    "sort_order": 99,
-                                },
+                                slug=f"auto_{uuid.uuid4().hex[:6]}",
+                                sort_order=99,
                             )
-
-                        # 複製商品
-                        Product.objects.create(
-                            store=target_store,
-                            category=target_category,
-                            name=master_product.name,
-                            price=master_product.price,
-                            stock=master_product.stock,
-                            flavor_options=master_product.flavor_options,
-                            description=master_product.description,
-                            is_active=master_product.is_active,
-                        )
+                            for target_store in other_stores
+                            if target_store.id not in target_categories
+                        ]
+                        for cat in Category.objects.bulk_create(new_categories):
+                            target_categories[cat.store_id] = cat
+
+                    # 複製商品 (單一 INSERT)
+                    Product.objects.bulk_create(
+                        [
+                            Product(
+                                store=target_store,
+                                category=target_categories.get(target_store.id),
+                                name=master_product.name,
+                                price=master_product.price,
+                                stock=master_product.stock,
+                                flavor_options=master_product.flavor_options,
+                                description=master_product.description,
+                                is_active=master_product.is_active,
+                            )
+                            for target_store in other_stores
+                        ]
+                    )
 
         except Exception as e:
-            # 這裡可以加 log，暫時先簡單處理
-            print(f"Batch Create Error: {e}")
+            logger.error("批量建立商品失敗: %s", e, exc_info=True)
 
     # 導回原本頁面
     return redirect(f"/backend/?store={current_store_id}")
@@ -903,8 +1343,10 @@ def _render_category_options(store_id):
     if not store_id:
         return options_html
 
-    categories = Category.objects.filter(store_id=store_id, is_active=True).order_by(
-        "sort_order", "id"
+    categories = (
+        Category.objects.filter(store_id=store_id, is_active=True)
+        .select_related("store")
+        .order_by("sort_order", "id")
     )
     for cat in categories:
         options_html += (
@@ -927,7 +1369,7 @@ def api_create_category(request):
     if not name:
         return JsonResponse({"status": "error", "error": "missing_name"}, status=400)
 
-    store = get_object_or_404(Store, id=store_id)
+    store = get_store_by_id_or_404(store_id)
 
     # 產生 slug：你原本用 uuid 方式 OK
     import uuid
@@ -1004,22 +1446,31 @@ def api_get_categories_options(request):
 @login_required
 def restock_page(request):
     """進貨頁面 (顯示清單)"""
-    stores = Store.objects.filter(is_active=True)
+    stores = get_active_stores()
 
     # 預設選第一間或網址參數指定
     current_store_id = request.GET.get("store")
     if current_store_id:
-        current_store = get_object_or_404(Store, id=current_store_id)
+        current_store = get_store_by_id_or_404(current_store_id)
     else:
-        current_store = stores.first()
+        current_store = stores[0] if stores else None
 
     if not current_store:
         return HttpResponse("請先建立分店")
 
     # 取得分類與商品 (一次撈出來，減少 DB 查詢)
+    # 進貨頁只顯示名稱 / 庫存 / 上下架，商品只載入這幾個欄位；
+    # 同一分類內依 id 排序即等同預設排序，也省掉對 category 的 JOIN
     categories = (
         Category.objects.filter(store=current_store)
-        .prefetch_related("products")
+        .prefetch_related(
+            Prefetch(
+                "products",
+                queryset=Product.objects.only(
+                    "id", "category_id", "name", "stock", "is_active"
+                ).order_by("id"),
+            )
+        )
         .order_by("sort_order")
     )
 
@@ -1039,6 +1490,8 @@ def batch_restock(request):
     """處理批次進貨 + 上下架狀態更新"""
     try:
         with transaction.atomic():
+            restock_updates = {}
+
             # 遍歷所有 POST 資料
             for key, value in request.POST.items():
 
@@ -1048,10 +1501,7 @@ def batch_restock(request):
                         pid = int(key.split("_")[-1])
                         qty = int(value)
                         if qty != 0:
-                            # 使用 F() 原子更新庫存
-                            Product.objects.filter(id=pid).update(
-                                stock=F("stock") + qty
-                            )
+                            restock_updates[pid] = qty
                     except (ValueError, TypeError):
                         continue
 
@@ -1068,8 +1518,11 @@ def batch_restock(request):
                 # 為了「快速」，上下架開關我們維持「點擊即時生效」(使用 quick_update_product)，
                 # 這樣進貨表單就單純處理「數量」，避免邏輯打架。
 
+            # 使用 F() 原子更新庫存，所有商品合併成一次 UPDATE
+            _add_stock(restock_updates)
+
         return HttpResponse("OK", status=200)
 
     except Exception as e:
-        print(f"Restock Error: {e}")
+        logger.error("批次進貨失敗: %s", e, exc_info=True)
         return HttpResponse("Error", status=500)
@@ -1,5 +1,7 @@
 import os
+import warnings
 import dj_database_url
+from importlib.util import find_spec
 from pathlib import Path
 
 # 1. 基本路徑設定
@@ -54,8 +56,12 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # 依回應內容自動加上 ETag，輪詢的看板 / 菜單內容沒變時回 304，不重送整包 JSON
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # 已登入 session 定期延長期限 (取代 SESSION_SAVE_EVERY_REQUEST)
+    "ordering.middleware.SessionRefreshMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -80,12 +86,60 @@ TEMPLATES = [
 WSGI_APPLICATION = "selfdrawn.wsgi.application"
 
 # 6. 資料庫設定 (優先讀取 DATABASE_URL)
-# 支援 PostgreSQL (正式) 或 SQLite (開發)
+# 正式環境一律使用 PostgreSQL：SQLite 會序列化所有寫入，select_for_update 也不起作用
+# SQLite 只作為開發 (DEBUG=True) 時的預設值
+if not DEBUG and not os.environ.get("DATABASE_URL"):
+    raise ValueError(
+        "DATABASE_URL environment variable is required in production (PostgreSQL)."
+    )
+
+# conn_max_age 讓連線跨請求重用；conn_health_checks 在重用前確認連線仍有效
+# SSL 等連線參數可直接寫在 DATABASE_URL 的 query string，例如 ?sslmode=require
 DATABASES = {
     "default": dj_database_url.config(
-        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}', conn_max_age=600
+        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
+        conn_max_age=600,
+        conn_health_checks=True,
     )
 }
+# 不把整個請求包成交易：只在寫入路徑 (建立訂單、修改品項、取消) 以 transaction.atomic() 包住，
+# 叫號看板、報表等讀取端點維持 autocommit，不必為唯讀查詢開交易。
+# LINE Pay 付款回調不開交易，以條件式 UPDATE (pending → paying) 搶下訂單，避免重複確認付款
+DATABASES["default"]["ATOMIC_REQUESTS"] = False
+
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    # 在 pg_stat_activity 中標示連線來源，方便排查慢查詢與連線數
+    DATABASES["default"].setdefault("OPTIONS", {}).setdefault(
+        "application_name", "selfdrawn"
+    )
+    # 前面接 pgbouncer (transaction pooling) 時，server-side cursor 無法跨交易存活，必須關閉
+    if os.environ.get("DB_PGBOUNCER", "False") == "True":
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# PostgreSQL 可改用 psycopg3 內建連線池 (需安裝 psycopg[binary,pool])，以 DB_POOL=True 開啟
+# requirements.txt 只裝 psycopg2-binary，未另外安裝 psycopg3 時直接報錯，而不是等到第一次連線才失敗
+# 連線池與 CONN_MAX_AGE 不可同時使用，開啟時改由連線池管理連線
+# 已經接 pgbouncer (DB_PGBOUNCER=True) 時不要再開，否則會重複做兩層連線池
+if (
+    os.environ.get("DB_POOL", "False") == "True"
+    and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql"
+):
+    if find_spec("psycopg") is None or find_spec("psycopg_pool") is None:
+        raise ValueError(
+            "DB_POOL=True requires psycopg 3 with the pool extra: "
+            "pip install 'psycopg[binary,pool]'"
+        )
+    if os.environ.get("DB_PGBOUNCER", "False") == "True":
+        warnings.warn(
+            "DB_POOL and DB_PGBOUNCER are both enabled; connections would be "
+            "pooled twice. Use only one of them.",
+            RuntimeWarning,
+        )
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "4")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "20")),
+    }
 
 # 7. 語言與時區 (設定為台灣)
 LANGUAGE_CODE = "zh-Hant"
@@ -100,7 +154,18 @@ STATICFILES_DIRS = [
     BASE_DIR / "selfdrawn" / "static",
 ]
 # 啟用壓縮與快取，優化讀取速度
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Django 5.1 起 STATICFILES_STORAGE 已移除，須改用 STORAGES 才會真正生效
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+# 帶 hash 的檔名由 WhiteNoise 回傳一年以上的 immutable 快取標頭，瀏覽器不必再發請求
+# 只保留帶 hash 的檔案，避免同一檔案以未版本化網址被長期快取
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
 
 # 9. 安全標頭與 HTTPS 設定 (當 DEBUG=False 時啟用)
 if not DEBUG:
@@ -127,7 +192,10 @@ if not DEBUG:
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = "Lax"
 SESSION_COOKIE_AGE = 3600  # 1 小時後過期
-SESSION_SAVE_EVERY_REQUEST = True
+# 不在每個請求都寫回 session (後台看板每幾秒輪詢一次，會變成持續寫入 session 表)
+# 改由 SessionRefreshMiddleware 每 5 分鐘延長一次期限，閒置約 1 小時後仍會登出
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = 300
 
 # 11. REST Framework 設定 (加入 API 流量限制)
 REST_FRAMEWORK = {
@@ -142,6 +210,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # 以 orjson 輸出 JSON 回應，速度較標準庫 json 快
+    "DEFAULT_RENDERER_CLASSES": [
+        "ordering.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -182,10 +255,31 @@ LOGGING = {
             "propagate": False,
         },
         # 這是您的 App 名稱，確保這裡能抓到 views.py 的 log
+        # DEBUG 等級只在開發模式輸出，正式環境直接略過 (不做字串格式化)
         "ordering": {
             "handlers": ["console"],
-            "level": "INFO",
+            "level": "DEBUG" if DEBUG else "INFO",
             "propagate": True,
         },
     },
 }
+
+# 13. 快取設定 (分店、報表、看板、整頁快取共用)
+# gunicorn 有多個 worker，快取必須跨程序共用：後台修改分店或訂單狀態時，
+# signals 清除 / 更新的 key 才會對所有 worker 生效 (預設的 LocMemCache 只在單一程序內有效)
+# 有 REDIS_URL 時使用 Redis，否則使用資料庫快取表 (build.sh 以 createcachetable 建立)
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        }
+    }